@@ -0,0 +1,191 @@
+import json
+import os
+import pygame
+from sprite_atlas import ATLAS_MANIFEST
+from asset_hashing import ASSET_MANIFEST
+
+# Process-wide registry of loaded images and sounds. Every asset is read
+# from disk once and the same Surface/Sound object is handed to every
+# caller, so restarting the game or spawning another car costs no I/O.
+#
+# If assets/images holds a sprite atlas (atlas.json, written by the web
+# build), packed sprites are subsurfaces of the one atlas image. If the
+# assets were published under content-hashed names (assets/manifest.json),
+# files are looked up by their original names through the manifest.
+#
+# Paths are anchored on this file, so tools run from another directory
+# load the same assets as the game.
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+IMAGE_DIR = os.path.join(ASSET_DIR, 'images')
+SOUND_DIR = os.path.join(ASSET_DIR, 'sounds')
+
+
+class AssetCache:
+    def __init__(self):
+        self.images = {}
+        self.sounds = {}
+        self.masks = {}
+        # Images that couldn't be read and were replaced by a placeholder
+        self.missing = set()
+        self.hits = 0
+        self.misses = 0
+        self.atlas_rects = None
+        self.atlas_path = None
+        self.atlas = None
+        self.atlas_converted = False
+        self.files = None
+
+    def resolve(self, path):
+        """The published (possibly content-hashed) path of an asset path"""
+        if self.files is None:
+            try:
+                with open(os.path.join(ASSET_DIR, ASSET_MANIFEST)) as f:
+                    self.files = json.load(f)['files']
+            except (OSError, ValueError, KeyError):
+                self.files = {}
+        if not self.files:
+            return path
+        key = os.path.relpath(path, ASSET_DIR).replace(os.sep, '/')
+        published = self.files.get(key)
+        return os.path.join(ASSET_DIR, *published.split('/')) if published else path
+
+    def load_atlas(self, image_dir=IMAGE_DIR):
+        """Read the atlas manifest of image_dir; returns whether there is one"""
+        self.atlas_rects = {}
+        self.atlas = None
+        try:
+            with open(os.path.join(image_dir, ATLAS_MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.atlas_path = os.path.join(image_dir, manifest['image'])
+        self.atlas_rects = {name: pygame.Rect(rect) for name, rect in manifest['sprites'].items()}
+        return True
+
+    def _atlas_sprite(self, name):
+        """Subsurface of the atlas for name, or None if name isn't packed"""
+        if self.atlas_rects is None:
+            self.load_atlas()
+        rect = self.atlas_rects.get(name)
+        if rect is None:
+            return None
+        if self.atlas is None:
+            try:
+                self.atlas = pygame.image.load(self.atlas_path)
+            except (pygame.error, FileNotFoundError) as e:
+                print(f"Couldn't load sprite atlas: {self.atlas_path}")
+                print(e)
+                self.atlas_rects = {}
+                return None
+            self.atlas_converted = False
+        if not self.atlas_converted and pygame.display.get_surface() is not None:
+            # Convert the whole sheet once; its sprites share the pixels
+            self.atlas = self.atlas.convert_alpha()
+            self.atlas_converted = True
+        return self.atlas.subsurface(rect)
+
+    def image(self, name, scale=1):
+        """
+        Return the image called name, scaled by scale. Images are converted
+        to the display pixel format as soon as a display exists so blits
+        don't have to convert pixels every frame.
+        """
+        key = (name, scale)
+        entry = self.images.get(key)
+        if entry is not None:
+            self.hits += 1
+            image, converted = entry
+            if not converted and pygame.display.get_surface() is not None:
+                image = self._store(key, image)
+            return image
+
+        self.misses += 1
+        if scale == 1:
+            image = self._read_image(name)
+        else:
+            base = self.image(name, 1)
+            image = pygame.transform.scale(base,
+                                           (int(base.get_width() * scale),
+                                            int(base.get_height() * scale)))
+        return self._store(key, image)
+
+    def _read_image(self, name):
+        sprite = self._atlas_sprite(name)
+        if sprite is not None:
+            return sprite
+        try:
+            return pygame.image.load(self.resolve(os.path.join(IMAGE_DIR, name)))
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Couldn't load image: {name}")
+            print(e)
+            self.missing.add(name)
+            return pygame.Surface((50, 50))
+
+    def _store(self, key, image):
+        converted = False
+        if pygame.display.get_surface() is not None:
+            if image.get_parent() is not None:
+                # Atlas sprite: slice it again from the converted sheet
+                image = self._atlas_sprite(key[0])
+            elif image.get_flags() & pygame.SRCALPHA:
+                image = image.convert_alpha()
+            else:
+                image = image.convert()
+            converted = True
+        self.images[key] = (image, converted)
+        return image
+
+    def mask(self, name):
+        """
+        Collision mask of the image called name (its opaque pixels), built
+        once and shared by every car drawn with that image. Raises
+        FileNotFoundError if the image can't be read: a placeholder's
+        mask would silently change the collisions.
+        """
+        mask = self.masks.get(name)
+        if mask is None:
+            image = self.image(name)
+            if name in self.missing:
+                raise FileNotFoundError(f"No image for the collision mask of {name}")
+            mask = self.masks[name] = pygame.mask.from_surface(image)
+        return mask
+
+    def sound(self, name):
+        """Return the sound called name, or None if it can't be loaded"""
+        if name in self.sounds:
+            self.hits += 1
+            return self.sounds[name]
+
+        self.misses += 1
+        try:
+            sound = pygame.mixer.Sound(self.resolve(os.path.join(SOUND_DIR, name)))
+        except Exception:
+            print(f"Couldn't load sound: {name}")
+            sound = None
+        self.sounds[name] = sound
+        return sound
+
+    def clear(self):
+        self.images.clear()
+        self.sounds.clear()
+        self.masks.clear()
+        self.missing.clear()
+        self.atlas_rects = None
+        self.atlas = None
+        self.files = None
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'images': len(self.images),
+            'sounds': len(self.sounds),
+            'atlas_sprites': len(self.atlas_rects or ()),
+        }
+
+
+# Shared by every front end in the process
+cache = AssetCache()
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+# Content-hashed file names for the web build. Every cacheable asset is
+# published as name.<hash>.ext, so its URL changes exactly when its bytes
+# do and browsers can keep it forever. The pages and manifests that point
+# at assets keep fixed names and are cached only briefly:
+#   - assets/manifest.json maps each original path to its hashed one
+#     (AssetCache resolves names through it),
+#   - the sprite atlas manifest names the hashed atlas image, and
+#   - references in the HTML pages are rewritten.
+
+ASSET_MANIFEST = 'manifest.json'
+HASHED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.wav', '.ogg', '.mp3',
+                     '.js', '.css', '.wasm', '.apk', '.data')
+HASH_LENGTH = 10
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# HTML and manifests: fresh for a minute, then revalidated
+SHORT_CACHE = 'public, max-age=60, must-revalidate'
+
+_HASHED_NAME = re.compile(r'\.[0-9a-f]{%d}\.[^./]+$' % HASH_LENGTH)
+
+
+def is_hashed(path):
+    return _HASHED_NAME.search(path) is not None
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def hashed_name(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+def publish_assets(source_dir, target_dir):
+    """
+    Replace target_dir with a copy of source_dir in which every cacheable
+    file has a content-hashed name, and write target_dir/manifest.json.
+    Returns {original path: hashed path}, both relative to target_dir
+    with forward slashes.
+    """
+    if os.path.isdir(target_dir):
+        shutil.rmtree(target_dir)  # Drops the hashed files of earlier builds
+    mapping = {}
+    for root, _, files in os.walk(source_dir):
+        for file in sorted(files):
+            source_path = os.path.join(root, file)
+            rel_path = os.path.relpath(source_path, source_dir).replace(os.sep, '/')
+            if file.lower().endswith(HASHED_EXTENSIONS):
+                published = hashed_name(rel_path, content_hash(source_path))
+                mapping[rel_path] = published
+            else:
+                published = rel_path
+            target_path = os.path.join(target_dir, *published.split('/'))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copy2(source_path, target_path)
+
+    rewrite_atlas_manifests(target_dir, mapping)
+    with open(os.path.join(target_dir, ASSET_MANIFEST), 'w') as f:
+        json.dump({'files': mapping}, f, indent=2, sort_keys=True)
+    return mapping
+
+def rewrite_atlas_manifests(target_dir, mapping):
+    """Point each sprite atlas manifest at its hashed atlas image"""
+    from sprite_atlas import ATLAS_MANIFEST
+
+    for root, _, files in os.walk(target_dir):
+        if ATLAS_MANIFEST not in files:
+            continue
+        path = os.path.join(root, ATLAS_MANIFEST)
+        with open(path) as f:
+            manifest = json.load(f)
+        directory = os.path.relpath(root, target_dir).replace(os.sep, '/')
+        image = manifest['image'] if directory == '.' else f"{directory}/{manifest['image']}"
+        if image in mapping:
+            manifest['image'] = mapping[image].rsplit('/', 1)[-1]
+            with open(path, 'w') as f:
+                json.dump(manifest, f, sort_keys=True, separators=(',', ':'))
+
+def rewrite_references(path, mapping, prefix='assets/'):
+    """Replace prefix + original path with prefix + hashed path in a text file"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    # Longest first, so no path is replaced inside a longer one
+    for original in sorted(mapping, key=len, reverse=True):
+        text = text.replace(prefix + original, prefix + mapping[original])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def html_references(path, prefix='assets/'):
+    """Asset paths (relative to prefix) referenced from an HTML page"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return set(re.findall(re.escape(prefix) + r'([\w./-]+)', text))
+
+def vercel_config(build_dir):
+    """
+    vercel.json contents for build_dir: everything is revalidated after a
+    minute except the content-hashed files, which are immutable.
+    """
+    hashed = []
+    for root, _, files in os.walk(build_dir):
+        for file in files:
+            if is_hashed(file):
+                hashed.append('/' + os.path.relpath(os.path.join(root, file), build_dir).replace(os.sep, '/'))
+    headers = [{'source': '/(.*)', 'headers': [{'key': 'Cache-Control', 'value': SHORT_CACHE}]}]
+    # Later rules win, so the hashed files override the default above
+    headers += [{'source': source, 'headers': [{'key': 'Cache-Control', 'value': IMMUTABLE_CACHE}]}
+                for source in sorted(hashed)]
+    return {
+        'version': 2,
+        # Files are served first; any other path falls back to the game page
+        'rewrites': [{'source': '/(.*)', 'destination': '/index.html'}],
+        'headers': headers,
+    }
@@ -0,0 +1,19 @@
+import pygame
+
+def create_heart():
+    """
+    Creates the heart shown for each remaining life
+    """
+    heart_surface = pygame.Surface((30, 30), pygame.SRCALPHA)
+    # Draw a heart shape
+    pygame.draw.polygon(heart_surface, (255, 0, 0), [
+        (15, 27),  # Bottom point
+        (5, 15),   # Left middle
+        (0, 8),    # Left top
+        (7, 0),    # Left curve
+        (15, 7),   # Middle top
+        (23, 0),   # Right curve
+        (30, 8),   # Right top
+        (25, 15)   # Right middle
+    ])
+    return heart_surface
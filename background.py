@@ -0,0 +1,89 @@
+import pygame
+
+# Pre-composited scrolling background. The road and the trees and bushes
+# beside it scroll together, so instead of blitting two 800x800 road tiles
+# and every prop each frame they are drawn once into a buffer the size of
+# the screen, used as a ring: when the road scrolls only the rows that
+# come into view at the top are rendered (a strip a few pixels tall), and
+# the buffer is shown with one blit, or two when the visible part wraps
+# around its end. The cost of a frame doesn't depend on how many props
+# there are, only on how many of them touch the new strip.
+#
+# World row v is shown at screen row v + distance, where distance is how
+# far the road has scrolled (simulation.Road.distance): rows count down as
+# the road goes on, and what is drawn at a row never changes.
+
+
+class BackgroundCompositor:
+    """
+    Tiles road_image vertically with props drawn over it. props is a
+    function (top, bottom) -> iterable of (image, x, v), the props whose
+    world rows overlap [top, bottom); a prop must be known before any of
+    its rows scroll into view and must not move relative to the road.
+    """
+    def __init__(self, road_image, props=None, size=None):
+        self.road_image = road_image
+        self.props = props
+        self.size = size or pygame.display.get_surface().get_size()
+        self.buffer = None
+        # World row at the top of the screen, None until the next full render
+        self.top = None
+        # Rows rendered by the last draw(), for the profiler and benchmarks
+        self.rendered_rows = 0
+
+    def invalidate(self):
+        """Render the whole screen again on the next draw()"""
+        self.top = None
+
+    def draw(self, surface, distance):
+        """Bring the buffer up to distance and blit it onto surface"""
+        surface.blits(self.views(distance), doreturn=False)
+
+    def views(self, distance):
+        """
+        Bring the buffer up to distance and return the (buffer, dest, area)
+        blits that show it
+        """
+        width, height = self.size
+        if self.buffer is None:
+            self.buffer = pygame.Surface(self.size)
+            if pygame.display.get_surface():
+                self.buffer = self.buffer.convert()
+
+        top = -int(round(distance))
+        if self.top is None or top > self.top or self.top - top >= height:
+            # First frame, a new race or a jump: everything is new
+            self.render(top, top + height)
+        elif top < self.top:
+            self.render(top, self.top)
+        else:
+            self.rendered_rows = 0
+        self.top = top
+
+        start = top % height
+        views = [(self.buffer, (0, 0), (0, start, width, height - start))]
+        if start:
+            views.append((self.buffer, (0, height - start), (0, 0, width, start)))
+        return views
+
+    def render(self, top, bottom):
+        """Draw world rows [top, bottom) into their rows of the ring"""
+        width, height = self.size
+        buffer = self.buffer
+        tile = self.road_image.get_height()
+        self.rendered_rows = bottom - top
+        while top < bottom:
+            # The part of the strip before the end of the ring
+            row = top % height
+            end = min(bottom, top + height - row)
+            offset = row - top
+            buffer.set_clip((0, row, width, end - top))
+            v = top - top % tile
+            while v < end:
+                buffer.blit(self.road_image, (0, v + offset))
+                v += tile
+            if self.props is not None:
+                buffer.blits([(image, (x, v + offset)) for image, x, v in self.props(top, end)],
+                             doreturn=False)
+            top = end
+        buffer.set_clip(None)
@@ -0,0 +1,183 @@
+import numpy as np
+from simulation import (
+    SCREEN_HEIGHT, ROAD_LEFT, ROAD_RIGHT, ROAD_HEIGHT,
+    PLAYER_SIZE, ENEMY_SIZE,
+    ENEMY_MIN_X, ENEMY_MAX_X, ENEMY_MIN_Y, ENEMY_MAX_Y,
+    ENEMY_MIN_SPEED, ENEMY_MAX_SPEED,
+    START_LIVES, START_ENEMY_COUNT, MAX_ENEMY_COUNT,
+    POINTS_PER_LEVEL, INVULNERABLE_FRAMES, SCREEN_WIDTH,
+)
+
+# Actions accepted by BatchRaceSim.step(), one per game
+ACTION_LEFT = -1
+ACTION_NONE = 0
+ACTION_RIGHT = 1
+
+PLAYER_SPEED = 6
+ROAD_SCROLL_SPEED = 5
+
+# Parked position for enemy slots that are not on the road yet
+INACTIVE_Y = -10 ** 6
+
+
+class BatchRaceSim:
+    """
+    N independent races advanced together with NumPy.
+
+    Uses the same update rules as simulation.Player, Enemy and Road, but
+    every piece of state lives in one array per field (structure of
+    arrays) so a single step() call moves all games at once. Scenery is
+    purely visual and is not simulated here.
+
+    Collisions are rect overlaps only: the pixel-mask test the game (and
+    episode_runner) applies on top is not modelled, so cars also crash on
+    the transparent corners of their sprites and scores come out lower
+    than in the real game. Use episode_runner to check tuned settings.
+    """
+    def __init__(self, num_games, seed=None,
+                 start_enemy_count=START_ENEMY_COUNT,
+                 max_enemy_count=MAX_ENEMY_COUNT,
+                 points_per_level=POINTS_PER_LEVEL,
+                 enemy_speed=(ENEMY_MIN_SPEED, ENEMY_MAX_SPEED)):
+        self.num_games = num_games
+        self.rng = np.random.default_rng(seed)
+        self.start_enemy_count = start_enemy_count
+        self.max_enemy_count = max_enemy_count
+        self.points_per_level = points_per_level
+        self.enemy_min_speed, self.enemy_max_speed = enemy_speed
+
+        n, m = num_games, max_enemy_count
+
+        # Player state; the player's y never changes
+        self.player_x = np.empty(n, dtype=np.int32)
+        self.player_y = SCREEN_HEIGHT - 20 - PLAYER_SIZE[1]
+        self.lives = np.empty(n, dtype=np.int32)
+        self.invulnerable_timer = np.empty(n, dtype=np.int32)
+
+        # Per-game progress
+        self.score = np.empty(n, dtype=np.int64)
+        self.level = np.empty(n, dtype=np.int32)
+        self.enemy_count = np.empty(n, dtype=np.int32)
+        self.game_over = np.empty(n, dtype=bool)
+        self.road_y = np.empty(n, dtype=np.int32)
+
+        # Enemy state, one row per game and one column per enemy slot
+        self.enemy_x = np.empty((n, m), dtype=np.int32)
+        self.enemy_y = np.empty((n, m), dtype=np.int32)
+        self.enemy_speed = np.empty((n, m), dtype=np.int32)
+        self.enemy_active = np.empty((n, m), dtype=bool)
+
+        # Lives lost by each game during the last step
+        self.hits = np.zeros(n, dtype=np.int32)
+
+        self.reset()
+
+    def reset(self, games=None):
+        """Restart all games, or only those selected by an index or bool mask"""
+        if games is None:
+            games = slice(None)
+
+        self.player_x[games] = SCREEN_WIDTH // 2 - PLAYER_SIZE[0] // 2
+        self.lives[games] = START_LIVES
+        self.invulnerable_timer[games] = 0
+        self.score[games] = 0
+        self.level[games] = 1
+        self.enemy_count[games] = self.start_enemy_count
+        self.game_over[games] = False
+        self.road_y[games] = 0
+
+        selected = self._select(games)
+        starting = np.arange(self.max_enemy_count) < self.start_enemy_count
+        self.enemy_active[selected] = False
+        self.enemy_y[selected] = INACTIVE_Y
+        self.enemy_speed[selected] = 0
+        self.enemy_active |= selected & starting
+        self._respawn(selected & starting)
+
+    def _select(self, games):
+        """Turn a game selector into an (N, slots) bool mask"""
+        mask = np.zeros(self.num_games, dtype=bool)
+        mask[games] = True
+        return np.broadcast_to(mask[:, None], self.enemy_active.shape)
+
+    def _respawn(self, mask, keep_speed=False):
+        """Give the enemies selected by mask a fresh random position (and speed)"""
+        count = int(np.count_nonzero(mask))
+        if not count:
+            return
+        self.enemy_x[mask] = self.rng.integers(ENEMY_MIN_X, ENEMY_MAX_X, count, endpoint=True)
+        self.enemy_y[mask] = self.rng.integers(ENEMY_MIN_Y, ENEMY_MAX_Y, count, endpoint=True)
+        if not keep_speed:
+            self.enemy_speed[mask] = self.rng.integers(self.enemy_min_speed, self.enemy_max_speed, count, endpoint=True)
+
+    def step(self, actions=ACTION_NONE):
+        """
+        Advance every running game by one frame. actions is a scalar or an
+        array of ACTION_LEFT / ACTION_NONE / ACTION_RIGHT, one per game.
+        Returns the game_over array.
+        """
+        alive = ~self.game_over
+        actions = np.broadcast_to(np.asarray(actions), (self.num_games,))
+
+        # Player movement, clamped to the road like Player.update()
+        move_left = alive & (actions < 0) & (self.player_x > ROAD_LEFT)
+        move_right = alive & (actions > 0) & (self.player_x + PLAYER_SIZE[0] < ROAD_RIGHT)
+        self.player_x -= move_left * PLAYER_SPEED
+        self.player_x += move_right * PLAYER_SPEED
+
+        # Invulnerability timer
+        ticking = alive & (self.invulnerable_timer > 0)
+        self.invulnerable_timer -= ticking
+
+        # Road scroll
+        self.road_y += alive * ROAD_SCROLL_SPEED
+        self.road_y[self.road_y >= 0] = -ROAD_HEIGHT + SCREEN_HEIGHT
+
+        # Enemy movement and respawn below the screen
+        moving = self.enemy_active & alive[:, None]
+        self.enemy_y += moving * self.enemy_speed
+        self._respawn(moving & (self.enemy_y > SCREEN_HEIGHT))
+
+        # AABB collision of each player against its own enemies
+        px = self.player_x[:, None]
+        py = self.player_y
+        colliding = (
+            moving
+            & (self.invulnerable_timer == 0)[:, None]
+            & (px < self.enemy_x + ENEMY_SIZE[0]) & (self.enemy_x < px + PLAYER_SIZE[0])
+            & (py < self.enemy_y + ENEMY_SIZE[1]) & (self.enemy_y < py + PLAYER_SIZE[1])
+        )
+        self.hits = colliding.sum(axis=1, dtype=np.int32)
+        hit = self.hits > 0
+        self.lives -= self.hits
+        crashed = hit & (self.lives <= 0)
+        self.game_over |= crashed
+        self.invulnerable_timer[hit & ~crashed] = INVULNERABLE_FRAMES
+        self._respawn(colliding, keep_speed=True)
+
+        # Score, level-up and extra enemies every second level
+        self.score += alive
+        level_up = alive & (self.score % self.points_per_level == 0)
+        self.level += level_up
+        add_enemy = level_up & (self.level % 2 == 0) & (self.enemy_count < self.max_enemy_count)
+        if add_enemy.any():
+            games = np.flatnonzero(add_enemy)
+            slots = self.enemy_count[games]
+            self.enemy_count[games] += 1
+            new = np.zeros_like(self.enemy_active)
+            new[games, slots] = True
+            self.enemy_active |= new
+            self._respawn(new)
+
+        return self.game_over
+
+    def run(self, policy=None, max_frames=10000):
+        """
+        Step until every game is over or max_frames have passed. policy is
+        called with the simulator each frame and returns the actions array.
+        """
+        for _ in range(max_frames):
+            if self.game_over.all():
+                break
+            self.step(ACTION_NONE if policy is None else policy(self))
+        return self.score
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+# Run without a window or sound card
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+# Repeatable performance benchmarks for the game and its build steps.
+#
+#   python benchmark.py                          run and write benchmark_results.json
+#   python benchmark.py --save-baseline          also store the results as the baseline
+#   python benchmark.py --compare benchmark_baseline.json
+#                                                exit with an error on regressions
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENEMY_COUNTS = (2, 4, 8, 16, 32, 64, 256)
+# Scenery density of the dense runs: 2,600 trees and bushes
+DENSE_SCENERY = 100
+
+
+def metric(value, unit, higher_is_better):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+def timed(func, *args):
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def bench_simulation(results, seconds=0.5):
+    """
+    Simulation steps per second of Game.update's logic at growing traffic,
+    in rush hour and with dense scenery
+    """
+    from asset_cache import cache
+    from simulation import RaceSimulation, rush_hour_settings
+
+    settings = [(f'{count}_enemies', dict(start_enemy_count=count, max_enemy_count=count))
+                for count in ENEMY_COUNTS]
+    settings.append(('rush_hour', rush_hour_settings()))
+    settings.append(('dense_scenery', dict(scenery_density=DENSE_SCENERY)))
+    for name, kwargs in settings:
+        # Pixel-mask collisions, as in the game
+        sim = RaceSimulation(random.Random(0), masks=cache.mask, **kwargs)
+        steps = 0
+        start = perf_counter()
+        while perf_counter() - start < seconds:
+            for _ in range(1000):
+                if sim.game_over:
+                    sim.reset()
+                sim.step()
+            steps += 1000
+        results[f'simulation_steps_per_sec_{name}'] = metric(
+            steps / (perf_counter() - start), 'steps/s', True)
+
+def bench_draw(results, frames=300):
+    """
+    Frames per second of Game.draw, with and without dirty rectangles,
+    with dense scenery and at each lower quality preset
+    """
+    from dirty_renderer import DirtyRenderer
+    from game import Game
+    from quality import QUALITY_PRESETS
+
+    best = QUALITY_PRESETS[0]
+    runs = [('draw_fps', False, best, 1.0),
+            ('draw_fps_dirty_rects', True, best, 1.0),
+            ('draw_fps_dense_scenery', False, best, DENSE_SCENERY)]
+    runs += [(f"draw_fps_quality_{preset['name']}", False, preset, preset['scenery_density'])
+             for preset in QUALITY_PRESETS[1:]]
+    for name, dirty, preset, density in runs:
+        game = Game()
+        game.renderer = DirtyRenderer(game.screen) if dirty else None
+        # Measure the preset asked for, not the one remembered for this machine
+        game.apply_quality(preset)
+        game.sim.set_scenery_density(density)
+        game.build_background()
+        for _ in range(60):
+            game.sim.step()
+        start = perf_counter()
+        for _ in range(frames):
+            game.sim.step()
+            game.draw()
+        results[name] = metric(frames / (perf_counter() - start), 'frames/s', True)
+        game.stop_music()
+
+def bench_assets(results):
+    """Cold (from disk) and warm (cached) time to load every game asset"""
+    from asset_cache import cache
+    from game import Game, load_image, load_sound
+    from simulation import ENEMY_IMAGES
+
+    images = list(Game.images.values()) + ENEMY_IMAGES
+    sounds = list(Game.sounds.values())
+
+    def load_all():
+        for name in images:
+            load_image(name)
+        for name in sounds:
+            load_sound(name)
+
+    cache.clear()
+    results['asset_load_cold_ms'] = metric(timed(load_all) * 1000, 'ms', False)
+    results['asset_load_warm_ms'] = metric(timed(load_all) * 1000, 'ms', False)
+
+def bench_sound_generation(results):
+    """Runtime of sound_generator.generate_sounds(), written to a temp dir"""
+    import sound_generator
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            seconds = timed(sound_generator.generate_sounds)
+        finally:
+            os.chdir(cwd)
+    results['generate_sounds_ms'] = metric(seconds * 1000, 'ms', False)
+
+def bench_build(results):
+    """build.py atlas packing, image optimization and zip time, written to a temp dir"""
+    try:
+        import build
+    except ImportError as e:
+        print(f"Skipping build benchmark: {e}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_dir = os.path.join(tmp, 'web')
+        assets_dir = os.path.join(build_dir, 'assets')
+        os.makedirs(assets_dir)
+        source = os.path.join(BASE_DIR, 'assets')
+        results['build_atlas_ms'] = metric(
+            timed(build.build_sprite_atlas, source, assets_dir) * 1000, 'ms', False)
+        results['build_optimize_ms'] = metric(
+            timed(build.optimize_images, source, assets_dir) * 1000, 'ms', False)
+        build.copy_non_image_files(source, assets_dir)
+        results['build_zip_ms'] = metric(
+            timed(build.create_deployment_zip, build_dir, os.path.join(tmp, 'web.zip')) * 1000, 'ms', False)
+
+BENCHMARKS = {
+    'simulation': bench_simulation,
+    'draw': bench_draw,
+    'assets': bench_assets,
+    'sounds': bench_sound_generation,
+    'build': bench_build,
+}
+
+
+def run_benchmarks(names=None):
+    from game import create_window
+
+    results = {}
+    # Asset paths are relative to the project directory
+    os.chdir(BASE_DIR)
+    create_window()
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        print(f"Running {name} benchmark...")
+        bench(results)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Print the change of every metric and return the names that regressed"""
+    regressions = []
+    for name, current in sorted(results.items()):
+        if name not in baseline:
+            print(f"  {name}: {current['value']:.2f} {current['unit']} (new)")
+            continue
+        old = baseline[name]['value']
+        new = current['value']
+        change = (new - old) / old if old else 0.0
+        worse = -change if current['higher_is_better'] else change
+        flag = ''
+        if worse > tolerance:
+            regressions.append(name)
+            flag = '  <-- REGRESSION'
+        print(f"  {name}: {old:.2f} -> {new:.2f} {current['unit']} ({change:+.1%}){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation, rendering, asset loading and build steps")
+    parser.add_argument('--output', default='benchmark_results.json', help="where to write the results")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare against a stored baseline")
+    parser.add_argument('--save-baseline', nargs='?', const='benchmark_baseline.json', metavar='PATH',
+                        help="also store the results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed slowdown before a metric counts as a regression (default 0.15)")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    results = run_benchmarks(args.only)
+    os.chdir(cwd)
+    pygame.quit()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Comparison with {args.compare}:")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,34 @@
+import argparse
 import os
 import sys
 import shutil
 import subprocess
 import zipfile
 import glob
+import hashlib
+import json
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import io
+import asset_hashing
+import sprite_atlas
+import static_server
+
+# The game synthesizes its background music while playing (music_stream.py),
+# so the pre-rendered track is left out of the web build, as is the
+# generate_assets.py build cache
+WEB_EXCLUDED_FILES = ['background_music.wav', 'asset_hashes.json']
+
+# Bump when optimize_image changes so the next build redoes every image
+OPTIMIZER_VERSION = 1
+
+# Deployment zip: fixed entry timestamp (the earliest zip can store) and
+# formats that are compressed already, so deflating them only costs time
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp3', '.ogg',
+                     '.zip', '.apk', '.gz', '.br')
 
 def create_directory(path):
     """Create directory if it doesn't exist"""
@@ -13,35 +36,112 @@ def create_directory(path):
         os.makedirs(path)
         print(f"Created directory: {path}")
 
-def optimize_image(input_path, output_path, quality=85):
-    """Optimize an image file"""
+def png_candidates(img):
+    """
+    Lossless PNG encodings of img: the image as it is and, when it has at
+    most 256 colours, an indexed version with per-entry alpha.
+    """
+    candidates = [('png', img, {})]
+    rgba = img.convert('RGBA')
+    colors = rgba.getcolors(256)
+    if colors is not None:
+        palette = [color for _, color in colors]
+        index = {color: i for i, color in enumerate(palette)}
+        indexed = Image.new('P', img.size)
+        indexed.putdata([index[pixel] for pixel in rgba.getdata()])
+        indexed.putpalette([channel for color in palette for channel in color[:3]])
+        params = {}
+        if img.mode == 'RGBA':
+            params['transparency'] = bytes(color[3] for color in palette)
+        candidates.append(('png-palette', indexed, params))
+    return candidates
+
+def encode(img, format, params):
+    buffer = io.BytesIO()
+    img.save(buffer, format, optimize=True, **params)
+    return buffer.getvalue()
+
+def same_pixels(data, original):
+    """Whether the encoded data decodes to exactly the original RGBA pixels"""
+    with Image.open(io.BytesIO(data)) as decoded:
+        return decoded.convert('RGBA').tobytes() == original.convert('RGBA').tobytes()
+
+def optimize_image(input_path, output_path, webp=False):
+    """
+    Write the smallest lossless PNG encoding of an image, keeping its
+    alpha channel, and with webp a lossless .webp sibling when that is
+    smaller still. Returns (original size, written size, encoding).
+    """
+    original_size = os.path.getsize(input_path)
     try:
         with Image.open(input_path) as img:
-            # Convert to RGB if RGBA (remove alpha channel)
-            if img.mode == 'RGBA':
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
-                img = background
-            
-            # Save with optimization
-            img.save(output_path, optimize=True, quality=quality)
-        
-        original_size = os.path.getsize(input_path)
-        optimized_size = os.path.getsize(output_path)
-        savings = original_size - optimized_size
-        
-        print(f"Optimized {input_path}: {original_size/1024:.1f}KB → {optimized_size/1024:.1f}KB (saved {savings/1024:.1f}KB)")
+            img.load()
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+
+        best = None
+        for encoding, candidate, params in png_candidates(img):
+            data = encode(candidate, 'PNG', params)
+            if (best is None or len(data) < len(best[1])) and same_pixels(data, img):
+                best = (encoding, data)
+        encoding, data = best
+        if len(data) >= original_size and input_path.lower().endswith('.png'):
+            with open(input_path, 'rb') as f:
+                encoding, data = 'original', f.read()
+        with open(output_path, 'wb') as f:
+            f.write(data)
+
+        webp_path = os.path.splitext(output_path)[0] + '.webp'
+        webp_data = encode(img, 'WEBP', {'lossless': True, 'method': 6}) if webp else None
+        if webp_data and len(webp_data) < len(data) and same_pixels(webp_data, img):
+            with open(webp_path, 'wb') as f:
+                f.write(webp_data)
+            encoding += '+webp'
+        elif os.path.exists(webp_path):
+            os.remove(webp_path)  # Left over from an earlier build
+        return original_size, len(data), encoding
     except Exception as e:
         print(f"Error optimizing {input_path}: {e}")
         # If optimization fails, just copy the original
         shutil.copy2(input_path, output_path)
+        return original_size, original_size, 'copy'
 
-def optimize_images(source_dir, target_dir):
-    """Optimize all images in a directory"""
+def _optimize_job(job):
+    return optimize_image(*job)
+
+def file_hash(path, webp):
+    digest = hashlib.sha256()
+    digest.update(repr((OPTIMIZER_VERSION, webp)).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+def load_image_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def optimize_images(source_dir, target_dir, skip=(), webp=False, cache_path=None, workers=None):
+    """
+    Optimize all images in a directory, except the source paths in skip,
+    across a process pool. With cache_path, images whose content (and
+    options) hashed the same in the previous build and whose output still
+    exists are left alone; each target_dir needs its own cache file, which
+    is rewritten with this run's images only. Returns the paths of the
+    outputs.
+    """
     image_extensions = ['.png', '.jpg', '.jpeg', '.gif']
+    cache = load_image_cache(cache_path) if cache_path else {}
     
+    jobs = []
+    hashes = {}
+    outputs = []
     for root, _, files in os.walk(source_dir):
         for file in files:
+            if os.path.join(root, file) in skip:
+                continue
             if any(file.lower().endswith(ext) for ext in image_extensions):
                 source_path = os.path.join(root, file)
                 # Create the same directory structure in target_dir
@@ -50,14 +150,60 @@ def optimize_images(source_dir, target_dir):
                 create_directory(target_subdir)
                 
                 target_path = os.path.join(target_subdir, file)
-                optimize_image(source_path, target_path)
+                outputs.append(target_path)
+                key = os.path.relpath(source_path, source_dir)
+                hashes[key] = file_hash(source_path, webp)
+                if cache.get(key) == hashes[key] and os.path.exists(target_path):
+                    print(f"Unchanged {source_path}")
+                    continue
+                jobs.append((source_path, target_path, webp))
+
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_optimize_job, jobs))
+    else:
+        results = [_optimize_job(job) for job in jobs]
+    for (source_path, _, _), (original_size, optimized_size, encoding) in zip(jobs, results):
+        savings = original_size - optimized_size
+        print(f"Optimized {source_path} ({encoding}): {original_size/1024:.1f}KB → {optimized_size/1024:.1f}KB (saved {savings/1024:.1f}KB)")
+
+    if cache_path:
+        create_directory(os.path.dirname(cache_path))
+        with open(cache_path, 'w') as f:
+            json.dump(hashes, f, indent=2, sort_keys=True)
+    return outputs + webp_siblings(outputs)
+
+def webp_siblings(paths):
+    """The .webp versions optimize_image wrote next to paths"""
+    siblings = [os.path.splitext(path)[0] + '.webp' for path in paths]
+    return [path for path in siblings if os.path.exists(path)]
+
+def build_sprite_atlas(source_dir, target_dir, webp=False):
+    """
+    Pack the small sprites of source_dir/images into one optimized atlas in
+    target_dir/images. Returns the source paths of the packed sprites,
+    which the build then leaves out, and the paths of the atlas files.
+    """
+    image_dir = os.path.join(source_dir, "images")
+    atlas_dir = os.path.join(target_dir, "images")
+    names = sprite_atlas.build_atlas(image_dir, atlas_dir)
+    atlas_path = os.path.join(atlas_dir, sprite_atlas.ATLAS_IMAGE)
+    original_size, optimized_size, encoding = optimize_image(atlas_path, atlas_path, webp)
+    print(f"Packed {len(names)} sprites into {sprite_atlas.ATLAS_IMAGE} ({encoding}, {optimized_size/1024:.1f}KB): {', '.join(names)}")
+    outputs = [atlas_path, os.path.join(atlas_dir, sprite_atlas.ATLAS_MANIFEST)]
+    return {os.path.join(image_dir, name) for name in names}, outputs + webp_siblings([atlas_path])
 
 def copy_non_image_files(source_dir, target_dir):
-    """Copy all non-image files to target directory"""
+    """Copy all non-image files to target directory; returns the copies' paths"""
     image_extensions = ['.png', '.jpg', '.jpeg', '.gif']
+    copied = []
     
-    for root, _, files in os.walk(source_dir):
+    for root, dirs, files in os.walk(source_dir):
+        if '__pycache__' in dirs:
+            dirs.remove('__pycache__')
         for file in files:
+            if file in WEB_EXCLUDED_FILES:
+                continue
             if not any(file.lower().endswith(ext) for ext in image_extensions):
                 source_path = os.path.join(root, file)
                 # Create the same directory structure in target_dir
@@ -67,7 +213,19 @@ def copy_non_image_files(source_dir, target_dir):
                 
                 target_path = os.path.join(target_subdir, file)
                 shutil.copy2(source_path, target_path)
+                copied.append(target_path)
                 print(f"Copied: {source_path} → {target_path}")
+    return copied
+
+def prune_directory(directory, keep):
+    """Delete the files under directory that are not in keep"""
+    keep = {os.path.normpath(path) for path in keep}
+    for root, _, files in os.walk(directory):
+        for file in files:
+            path = os.path.join(root, file)
+            if os.path.normpath(path) not in keep:
+                os.remove(path)
+                print(f"Removed stale {path}")
 
 def create_netlify_config(build_dir):
     """Create netlify.toml configuration file"""
@@ -86,20 +244,9 @@ def create_netlify_config(build_dir):
     print("Created netlify.toml configuration file")
 
 def create_vercel_config(build_dir):
-    """Create vercel.json configuration file"""
-    config_content = """
-{
-  "version": 2,
-  "builds": [
-    { "src": "**/*", "use": "@vercel/static" }
-  ],
-  "routes": [
-    { "src": "/(.*)", "dest": "/" }
-  ]
-}
-"""
+    """Create vercel.json configuration file with the caching headers"""
     with open(os.path.join(build_dir, "vercel.json"), "w") as f:
-        f.write(config_content.strip())
+        json.dump(asset_hashing.vercel_config(build_dir), f, indent=2)
     print("Created vercel.json configuration file")
 
 def create_github_workflow(repo_dir):
@@ -132,39 +279,155 @@ jobs:
         f.write(workflow_content.strip())
     print("Created GitHub Actions workflow for GitHub Pages")
 
-def main():
+def zip_entries(build_dir):
+    """(archive name, path) of every file to ship, sorted by archive name"""
+    entries = []
+    for root, _, files in os.walk(build_dir):
+        for file in files:
+            if file.endswith(static_server.PRECOMPRESSED_SUFFIXES):
+                continue  # Only for static_server; the hosts compress themselves
+            file_path = os.path.join(root, file)
+            arcname = os.path.relpath(file_path, build_dir).replace(os.sep, '/')
+            entries.append((arcname, file_path))
+    return sorted(entries)
+
+def zip_info(arcname):
+    """
+    ZipInfo with everything that would vary between machines and builds
+    (timestamp, permissions, host system) fixed
+    """
+    info = zipfile.ZipInfo(arcname, date_time=ZIP_TIMESTAMP)
+    info.create_system = 3  # Unix
+    info.external_attr = 0o644 << 16
+    if arcname.lower().endswith(STORED_EXTENSIONS):
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+def copy_zip_entry(source, info, target):
+    """
+    Append the already compressed data of info from the source archive to
+    target as is. Reusing the bytes gives exactly what compressing the
+    unchanged file again would, without the work.
+    """
+    source.fp.seek(info.header_offset)
+    name_length, extra_length = struct.unpack('<HH', source.fp.read(30)[26:30])
+    source.fp.seek(info.header_offset + 30 + name_length + extra_length)
+    data = source.fp.read(info.compress_size)
+
+    entry = zip_info(info.filename)
+    entry.compress_type = info.compress_type
+    entry.CRC = info.CRC
+    entry.compress_size = info.compress_size
+    entry.file_size = info.file_size
+    entry.header_offset = target.fp.tell()
+    target.fp.write(entry.FileHeader())
+    target.fp.write(data)
+    target.filelist.append(entry)
+    target.NameToInfo[entry.filename] = entry
+    target.start_dir = target.fp.tell()
+
+def create_deployment_zip(build_dir, zip_path):
+    """
+    Zip the contents of build_dir for easy upload. The archive is
+    byte-for-byte reproducible: entries are sorted and carry fixed
+    timestamps and permissions, text-like files are deflated and formats
+    that are compressed already are stored. Entries of an existing
+    archive whose file is unchanged are copied over without compressing
+    them again, and an archive that would come out identical is left
+    alone. Returns (entries written, entries reused).
+    """
+    entries = zip_entries(build_dir)
+    previous = {}
+    old = None
+    if os.path.exists(zip_path):
+        try:
+            old = zipfile.ZipFile(zip_path)
+            previous = {info.filename: info for info in old.infolist()}
+        except zipfile.BadZipFile:
+            old = None
+
+    try:
+        changed = []
+        for arcname, file_path in entries:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            info = previous.get(arcname)
+            if (info is None or info.CRC != zlib.crc32(data) or info.file_size != len(data)
+                    or info.compress_type != zip_info(arcname).compress_type):
+                changed.append(arcname)
+        if old is not None and not changed and [info.filename for info in old.infolist()] == [name for name, _ in entries]:
+            return 0, len(entries)
+
+        tmp_path = zip_path + '.tmp'
+        with zipfile.ZipFile(tmp_path, 'w') as zipf:
+            for arcname, file_path in entries:
+                if arcname in changed:
+                    with open(file_path, 'rb') as f:
+                        zipf.writestr(zip_info(arcname), f.read(), compresslevel=9)
+                else:
+                    copy_zip_entry(old, previous[arcname], zipf)
+    finally:
+        if old is not None:
+            old.close()
+    os.replace(tmp_path, zip_path)
+    return len(changed), len(entries) - len(changed)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the web version of the game into build/web")
+    parser.add_argument('--webp', action='store_true', help="also write lossless .webp versions of the images")
+    parser.add_argument('--jobs', type=int, default=None, help="image optimization worker processes")
+    args = parser.parse_args(argv)
+
     # Define directories
     base_dir = os.path.dirname(os.path.abspath(__file__))
     build_dir = os.path.join(base_dir, "build", "web")
     assets_dir = os.path.join(base_dir, "assets")
-    optimized_assets_dir = os.path.join(build_dir, "assets")
+    # Optimized assets are kept here between builds, then published into
+    # build_dir under content-hashed names
+    optimized_assets_dir = os.path.join(base_dir, "build", "stage", "assets")
+    index_path = os.path.join(base_dir, "index.html")
     
     # Create build directory
     create_directory(build_dir)
     create_directory(optimized_assets_dir)
     
     # Copy and optimize assets
+    print("Packing sprite atlas...")
+    packed, produced = build_sprite_atlas(assets_dir, optimized_assets_dir, args.webp)
+    # Sprites the page itself shows still need their own file
+    referenced = {os.path.join(assets_dir, *path.split('/')) for path in asset_hashing.html_references(index_path)}
     print("Optimizing and copying assets...")
-    optimize_images(assets_dir, optimized_assets_dir)
-    copy_non_image_files(assets_dir, optimized_assets_dir)
+    produced += optimize_images(assets_dir, optimized_assets_dir, skip=packed - referenced, webp=args.webp,
+                                cache_path=os.path.join(base_dir, "build", "image_cache.json"),
+                                workers=args.jobs)
+    produced += copy_non_image_files(assets_dir, optimized_assets_dir)
+    # Only publish what this build produced, not images deleted from assets
+    # or packed into the atlas since an earlier build
+    prune_directory(optimized_assets_dir, produced)
+    
+    print("Publishing assets under content-hashed names...")
+    mapping = asset_hashing.publish_assets(optimized_assets_dir, os.path.join(build_dir, "assets"))
+    print(f"Hashed {len(mapping)} asset file(s)")
     
     # Copy main HTML and other files
     print("Copying main files...")
-    shutil.copy2(os.path.join(base_dir, "index.html"), build_dir)
+    shutil.copy2(index_path, build_dir)
+    asset_hashing.rewrite_references(os.path.join(build_dir, "index.html"), mapping)
     
     # Create platform-specific configuration files
     create_netlify_config(build_dir)
     create_vercel_config(build_dir)
     create_github_workflow(base_dir)
     
+    # Precompressed .br/.gz variants for static_server.py
+    print(f"Precompressed {static_server.precompress(build_dir)} file variant(s)")
+    
     # Create a zip file for easy upload
     print("Creating deployment zip file...")
-    with zipfile.ZipFile(os.path.join(base_dir, "car_racing_game_web.zip"), 'w') as zipf:
-        for root, _, files in os.walk(build_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, build_dir)
-                zipf.write(file_path, arcname)
+    written, reused = create_deployment_zip(build_dir, os.path.join(base_dir, "car_racing_game_web.zip"))
+    print(f"Zipped {written} changed file(s), reused {reused} unchanged")
     
     print("\nBuild completed successfully!")
     print(f"Web files are in: {build_dir}")
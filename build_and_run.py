@@ -3,6 +3,7 @@ import sys
 import subprocess
 import shutil
 import webbrowser
+import static_server
 import time
 import platform
 
@@ -46,8 +47,6 @@ def optimize_images():
     """Optimize images for web deployment"""
     print("\n=== Optimizing images ===")
     try:
-        from PIL import Image
-        
         # Get the current directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         assets_dir = os.path.join(current_dir, "assets", "images")
@@ -56,31 +55,11 @@ def optimize_images():
         # Create directory if it doesn't exist
         os.makedirs(build_assets_dir, exist_ok=True)
         
-        # Optimize each image
-        for filename in os.listdir(assets_dir):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                input_path = os.path.join(assets_dir, filename)
-                output_path = os.path.join(build_assets_dir, filename)
-                
-                try:
-                    with Image.open(input_path) as img:
-                        # Resize if too large
-                        max_size = (800, 600)
-                        if img.width > max_size[0] or img.height > max_size[1]:
-                            img.thumbnail(max_size, Image.LANCZOS)
-                        
-                        # Save with optimization
-                        img.save(output_path, optimize=True, quality=85)
-                    
-                    original_size = os.path.getsize(input_path)
-                    optimized_size = os.path.getsize(output_path)
-                    savings = original_size - optimized_size
-                    
-                    print(f"Optimized {filename}: {original_size/1024:.1f}KB -> {optimized_size/1024:.1f}KB (saved {savings/1024:.1f}KB)")
-                except Exception as e:
-                    print(f"Error optimizing {filename}: {e}")
-                    # If optimization fails, just copy the original
-                    shutil.copy2(input_path, output_path)
+        # Same lossless, alpha-preserving optimizer as build.py (imported
+        # here: it needs Pillow, which check_requirements() may install)
+        import build
+        build.optimize_images(assets_dir, build_assets_dir,
+                              cache_path=os.path.join(current_dir, "build", "web_image_cache.json"))
         
         print("+ Images optimized successfully!")
         return True
@@ -121,7 +100,10 @@ def copy_html_files():
     build_sounds_dir = os.path.join(build_dir, "assets", "sounds")
     
     if os.path.exists(sounds_dir):
+        import build
         for filename in os.listdir(sounds_dir):
+            if filename in build.WEB_EXCLUDED_FILES:
+                continue
             if filename.lower().endswith(('.wav', '.mp3', '.ogg')):
                 try:
                     shutil.copy2(os.path.join(sounds_dir, filename), build_sounds_dir)
@@ -142,28 +124,17 @@ def start_local_server():
         print("Error: Build directory not found. Please build the game first.")
         return False
     
-    # Change to the build directory
-    os.chdir(build_dir)
-    
     # Determine an available port
     port = 8000
     
-    print(f"Starting server at http://localhost:{port}")
-    print("Press Ctrl+C to stop the server")
-    
     # Open the browser
     webbrowser.open(f"http://localhost:{port}")
     
     # Start the server
     try:
-        # Use the http.server module
-        server_command = [sys.executable, "-m", "http.server", str(port)]
-        subprocess.run(server_command)
-        return True
-    except KeyboardInterrupt:
-        print("\nServer stopped")
+        static_server.serve(build_dir, port)
         return True
-    except Exception as e:
+    except OSError as e:
         print(f"Error starting server: {e}")
         return False
 
@@ -193,7 +164,7 @@ def main():
         start_local_server()
     else:
         print("\nTo test the game later, run:")
-        print("python -m http.server 8000")
+        print("python static_server.py")
         print("And open http://localhost:8000 in your browser")
     
     print("\n===== Deployment Options =====")
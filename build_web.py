@@ -3,6 +3,7 @@ import sys
 import os
 import webbrowser
 import time
+import static_server
 
 def main():
     print("Building web version of the game...")
@@ -37,21 +38,11 @@ def main():
         print(f"Error: Build directory not found at {build_dir}")
         return
     
-    # Start a local server
-    print(f"Starting local server at http://localhost:8000")
-    print("Press Ctrl+C to stop the server")
-    
-    # Change to the build directory
-    os.chdir(build_dir)
-    
     # Open browser
     webbrowser.open("http://localhost:8000")
     
-    # Start server
-    try:
-        subprocess.run([sys.executable, "-m", "http.server", "8000"])
-    except KeyboardInterrupt:
-        print("Server stopped")
+    # Start a local server
+    static_server.serve(build_dir, 8000)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,115 @@
+# Broadphase for the cars on the road. The road is cut into lanes (columns)
+# and rows of fixed height, and every entity is filed under the one cell
+# that holds the top-left corner of its rect. Entities are no bigger than a
+# cell, so anything overlapping a rect is filed at most one lane left of it
+# and one row above it; a query only looks at those few cells, so its cost
+# depends on the local traffic instead of the total number of cars.
+#
+# Cars only change cells every few dozen steps: insert() and move() return
+# the y at which a car moving down next needs to be refiled, so the cars
+# can skip calling move() until then.
+
+LANE_WIDTH = 100
+CELL_HEIGHT = 150
+
+
+class SpatialHash:
+    """
+    Uniform grid over the road between left and right. Entities are any
+    objects with a pygame.Rect in .rect no larger than lane_width x
+    cell_height; queries return them in the order they were first
+    inserted, so results don't depend on cell layout.
+    """
+    def __init__(self, left, right, lane_width=LANE_WIDTH, cell_height=CELL_HEIGHT):
+        self.left = left
+        self.lane_width = lane_width
+        self.cell_height = cell_height
+        self.last_lane = max(1, -(-(right - left) // lane_width)) - 1
+        # (lane, row) -> {entity: None}, used as an insertion-ordered set
+        self.cells = {}
+        # entity -> (lane, row) it is filed under
+        self.filed = {}
+        self.order = {}
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self.filed)
+
+    def __contains__(self, entity):
+        return entity in self.filed
+
+    def lane(self, x):
+        # Anything off the road side is filed under the outermost lane
+        return min(max((x - self.left) // self.lane_width, 0), self.last_lane)
+
+    def insert(self, entity):
+        """File entity; returns the y at which it has to be refiled next"""
+        if entity in self.filed:
+            return self.move(entity)
+        self.order[entity] = self._next_order
+        self._next_order += 1
+        rect = entity.rect
+        row = rect.y // self.cell_height
+        cell = self.filed[entity] = (self.lane(rect.x), row)
+        self.cells.setdefault(cell, {})[entity] = None
+        return (row + 1) * self.cell_height
+
+    def remove(self, entity):
+        cell = self.filed.pop(entity, None)
+        if cell is None:
+            return
+        del self.order[entity]
+        bucket = self.cells[cell]
+        del bucket[entity]
+        if not bucket:
+            del self.cells[cell]
+
+    def move(self, entity):
+        """
+        Refile entity after its rect changed (a no-op unless it left its
+        cell). Returns the y at which it has to be refiled next.
+        """
+        rect = entity.rect
+        row = rect.y // self.cell_height
+        cell = (self.lane(rect.x), row)
+        old = self.filed[entity]
+        if cell != old:
+            self.filed[entity] = cell
+            bucket = self.cells[old]
+            del bucket[entity]
+            if not bucket:
+                del self.cells[old]
+            self.cells.setdefault(cell, {})[entity] = None
+        return (row + 1) * self.cell_height
+
+    def clear(self):
+        self.cells.clear()
+        self.filed.clear()
+        self.order.clear()
+        self._next_order = 0
+
+    def nearby(self, rect):
+        """Entities filed where they could overlap rect (a superset of the hits)"""
+        cells = self.cells
+        height = self.cell_height
+        found = {}
+        for lane in range(self.lane(rect.left - self.lane_width + 1), self.lane(rect.right - 1) + 1):
+            for row in range((rect.top - height + 1) // height, (rect.bottom - 1) // height + 1):
+                bucket = cells.get((lane, row))
+                if bucket:
+                    found.update(bucket)
+        if len(found) > 1:
+            return sorted(found, key=self.order.__getitem__)
+        return list(found)
+
+    def colliding(self, rect, ignore=None):
+        """Entities whose rect overlaps rect, in insertion order"""
+        return [entity for entity in self.nearby(rect)
+                if entity is not ignore and rect.colliderect(entity.rect)]
+
+    def is_clear(self, rect, ignore=None):
+        """Whether no entity other than ignore overlaps rect"""
+        for entity in self.nearby(rect):
+            if entity is not ignore and rect.colliderect(entity.rect):
+                return False
+        return True
@@ -0,0 +1,89 @@
+import pygame
+
+# Dirty-rectangle drawing. The game draws each frame into a DisplayList
+# instead of straight onto the screen; DirtyRenderer compares it with the
+# previous frame and only redraws and pushes the regions that changed
+# with pygame.display.update(rects). When the road is scrolling nearly
+# every pixel changes, so Game only uses it while the road stands still
+# (the game-over screen) and otherwise draws straight to the screen.
+
+# Above this share of the screen a single full update is cheaper
+FULL_UPDATE_RATIO = 0.5
+
+
+class DisplayList:
+    """Records fill() and blit() calls so they can be diffed and replayed"""
+    def __init__(self):
+        self.items = []
+
+    def fill(self, color, rect=None):
+        if rect is not None:
+            rect = tuple(pygame.Rect(rect))
+        self.items.append((None, tuple(color), rect, None))
+
+    def blit(self, image, dest, area=None):
+        if isinstance(dest, pygame.Rect):
+            x, y = dest.topleft
+        else:
+            x, y = dest
+        if area is not None:
+            area = tuple(pygame.Rect(area))
+        self.items.append((image, int(x), int(y), area))
+
+    def blits(self, sequence, doreturn=True):
+        for item in sequence:
+            self.blit(*item)
+
+    def replay(self, surface):
+        for image, a, b, area in self.items:
+            if image is None:
+                surface.fill(a, b)
+            else:
+                surface.blit(image, (a, b), area)
+
+
+def item_rect(item, screen_rect):
+    image, a, b, area = item
+    if image is None:
+        return pygame.Rect(b) if b is not None else screen_rect
+    if area is not None:
+        return pygame.Rect((a, b), area[2:])
+    return pygame.Rect((a, b), image.get_size())
+
+
+class DirtyRenderer:
+    def __init__(self, screen):
+        self.screen = screen
+        self.screen_rect = screen.get_rect()
+        self.previous = []
+        self.updated_rects = 0
+
+    def invalidate(self):
+        """Force a full redraw next frame, e.g. after drawing a loading screen"""
+        self.previous = []
+
+    def present(self, display_list):
+        """Draw display_list and push only the parts of the screen that changed"""
+        items = display_list.items
+        changed = set(self.previous).symmetric_difference(items)
+        self.previous = items
+        if not changed:
+            self.updated_rects = 0
+            return
+
+        dirty = [item_rect(item, self.screen_rect).clip(self.screen_rect) for item in changed]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        area = sum(rect.width * rect.height for rect in dirty)
+        if area >= FULL_UPDATE_RATIO * self.screen_rect.width * self.screen_rect.height:
+            display_list.replay(self.screen)
+            pygame.display.flip()
+            self.updated_rects = 1
+            return
+
+        # Redraw everything that overlaps each changed region, clipped to it
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            display_list.replay(self.screen)
+        self.screen.set_clip(None)
+        pygame.display.update(dirty)
+        self.updated_rects = len(dirty)
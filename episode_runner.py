@@ -0,0 +1,114 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from asset_cache import cache
+from simulation import (
+    RaceSimulation, START_LIVES, START_ENEMY_COUNT, MAX_ENEMY_COUNT,
+    ENEMY_MIN_SPEED, ENEMY_MAX_SPEED, POINTS_PER_LEVEL,
+)
+
+# Runs many headless races across a process pool. Every episode gets its
+# own random.Random seeded from the job, so a result can be reproduced
+# exactly by running the same job again on any machine.
+#
+# Cars collide on their opaque pixels, as in the shipped game. The masks
+# come from the process-wide asset cache, so each worker builds them once
+# and shares them between all its episodes.
+
+def run_episode(seed, max_frames=None, policy=None, masks=True, **settings):
+    """
+    Play one headless race and return its result. settings are passed on
+    to RaceSimulation (start_enemy_count, enemy_speed, points_per_level...).
+    policy must be a module-level function so it can be sent to workers.
+    Without masks cars collide when their rects overlap (faster, but not
+    the game that ships).
+    """
+    sim = RaceSimulation(random.Random(seed), masks=cache.mask if masks else None, **settings)
+    sim.run(policy, max_frames)
+    result = {
+        'seed': seed,
+        'score': sim.score,
+        'level': sim.level,
+        'lives_lost': START_LIVES - sim.player.lives,
+        'frames': sim.frames,
+        'masks': masks,
+    }
+    result.update(settings)
+    return result
+
+def _run_batch(jobs):
+    return [run_episode(**job) for job in jobs]
+
+def _batches(jobs, size):
+    jobs = iter(jobs)
+    while True:
+        batch = list(itertools.islice(jobs, size))
+        if not batch:
+            return
+        yield batch
+
+def run_episodes(jobs, workers=None, batch_size=8):
+    """
+    Run every job (a dict of run_episode() keyword arguments) in a process
+    pool and yield the results as they complete. Jobs are sent in small
+    batches so short episodes don't drown in inter-process overhead.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_batch, batch) for batch in _batches(jobs, batch_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def sweep_jobs(episodes, base_seed=0, enemy_counts=(START_ENEMY_COUNT,),
+               speeds=((ENEMY_MIN_SPEED, ENEMY_MAX_SPEED),),
+               level_thresholds=(POINTS_PER_LEVEL,), max_frames=None, masks=(True,)):
+    """
+    Build the job list for a parameter sweep: every combination of enemy
+    count, enemy speed range, level threshold and collision test (masks),
+    each played with the same seeds so settings are compared on identical
+    traffic.
+    """
+    for enemy_count, speed, threshold, use_masks in itertools.product(
+            enemy_counts, speeds, level_thresholds, masks):
+        for seed in range(base_seed, base_seed + episodes):
+            yield {
+                'seed': seed,
+                'max_frames': max_frames,
+                'start_enemy_count': enemy_count,
+                'max_enemy_count': max(enemy_count, MAX_ENEMY_COUNT),
+                'enemy_speed': tuple(speed),
+                'points_per_level': threshold,
+                'masks': use_masks,
+            }
+
+def parse_speed(text):
+    """Parse an enemy speed range written as MIN-MAX"""
+    low, _, high = text.partition('-')
+    return (int(low), int(high or low))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless races in parallel and print one JSON result per line")
+    parser.add_argument('--episodes', type=int, default=100, help="episodes per parameter combination")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first episode")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--max-frames', type=int, default=100000, help="stop an episode after this many frames")
+    parser.add_argument('--enemy-count', type=int, nargs='+', default=[START_ENEMY_COUNT])
+    parser.add_argument('--speed', type=parse_speed, nargs='+', default=[(ENEMY_MIN_SPEED, ENEMY_MAX_SPEED)],
+                        help="enemy speed ranges, e.g. 3-7")
+    parser.add_argument('--level-threshold', type=int, nargs='+', default=[POINTS_PER_LEVEL])
+    parser.add_argument('--masks', choices=['on', 'off'], nargs='+', default=['on'],
+                        help="collide on opaque pixels (on, as in the game) or on rects (off)")
+    args = parser.parse_args(argv)
+
+    jobs = sweep_jobs(args.episodes, args.seed, args.enemy_count, args.speed,
+                      args.level_threshold, args.max_frames,
+                      [choice == 'on' for choice in args.masks])
+    for result in run_episodes(jobs, args.workers):
+        sys.stdout.write(json.dumps(result) + '\n')
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
+import math
+import numpy as np
 import pygame
-import random
-import os
 import sys
+from time import perf_counter
 from pygame import mixer
-
-# Initialize pygame
-pygame.init()
-mixer.init()
-
-# Game window dimensions
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
+from asset_cache import cache
+from simulation import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, PLAYER_IMAGE, ENEMY_IMAGES,
+    EVENT_CRASH, EVENT_LIFE_LOST, EVENT_LEVEL_UP,
+    RaceSimulation,
+)
+from timestep import FixedTimestep, interpolate
+from dirty_renderer import DirtyRenderer, DisplayList
+from background import BackgroundCompositor
+from render_queue import (
+    RenderQueue, LAYER_BACKGROUND, LAYER_CLOUDS, LAYER_CARS, LAYER_HUD, LAYER_OVERLAY,
+)
+from text_cache import TextCache
+from profiler import FrameProfiler
+from quality import QUALITY_PRESETS, QualityGovernor
 
 # Colors
 WHITE = (255, 255, 255)
@@ -19,315 +27,394 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
+SKY_BLUE = (135, 206, 235)
 
-# Create game window
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Kids Car Racing Adventure")
-clock = pygame.time.Clock()
-
-# Load images
+# Load images (shared through the process-wide asset cache)
 def load_image(name, scale=1):
-    try:
-        image = pygame.image.load(os.path.join('assets', 'images', name))
-        image = pygame.transform.scale(image, 
-                                      (int(image.get_width() * scale), 
-                                       int(image.get_height() * scale)))
-        return image
-    except pygame.error as e:
-        print(f"Couldn't load image: {name}")
-        print(e)
-        return pygame.Surface((50, 50))
+    return cache.image(name, scale)
+
+# Collision masks, built once per image
+def load_mask(name):
+    return cache.mask(name)
 
 # Load sounds
 def load_sound(name):
-    try:
-        sound = mixer.Sound(os.path.join('assets', 'sounds', name))
-        return sound
-    except:
-        print(f"Couldn't load sound: {name}")
-        return None
-
-class Player(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        self.image = load_image('lamborghini.png', 1)
-        self.rect = self.image.get_rect()
-        self.rect.centerx = SCREEN_WIDTH // 2
-        self.rect.bottom = SCREEN_HEIGHT - 20
-        self.speed = 6  # Slightly faster for a Lamborghini
-        self.score = 0
-        self.lives = 4  # Player starts with 4 lives
-        self.invulnerable = False
-        self.invulnerable_timer = 0
-        
-    def update(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] and self.rect.left > 150:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.rect.right < SCREEN_WIDTH - 150:
-            self.rect.x += self.speed
-            
-        # Update invulnerability timer
-        if self.invulnerable:
-            self.invulnerable_timer -= 1
-            if self.invulnerable_timer <= 0:
-                self.invulnerable = False
-            
-    def draw(self, surface):
-        # Make the car blink when invulnerable
-        if self.invulnerable and self.invulnerable_timer % 10 < 5:
-            return  # Skip drawing to create blinking effect
-        surface.blit(self.image, self.rect)
-        
-    def make_invulnerable(self, duration=120):  # 2 seconds at 60 FPS
-        self.invulnerable = True
-        self.invulnerable_timer = duration
-
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        # Randomly select one of the enemy car images
-        car_images = ['enemy_car1.png', 'enemy_car2.png', 'enemy_car3.png']
-        self.image = load_image(random.choice(car_images), 1)
-        self.rect = self.image.get_rect()
-        self.rect.x = random.randint(150, SCREEN_WIDTH - 200)
-        self.rect.y = random.randint(-500, -100)
-        self.speed = random.randint(3, 7)
-        
-    def update(self):
-        self.rect.y += self.speed
-        if self.rect.top > SCREEN_HEIGHT:
-            self.rect.x = random.randint(150, SCREEN_WIDTH - 200)
-            self.rect.y = random.randint(-500, -100)
-            self.speed = random.randint(3, 7)
-            
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
-
-class Road:
-    def __init__(self):
-        self.image = load_image('road.png', 1)
-        self.rect = self.image.get_rect()
-        self.rect.y = 0
-        self.scroll_speed = 5
-        
-    def update(self):
-        self.rect.y += self.scroll_speed
-        if self.rect.y >= 0:
-            self.rect.y = -self.rect.height + SCREEN_HEIGHT
-            
-    def draw(self, surface):
-        surface.blit(self.image, (0, self.rect.y))
-        surface.blit(self.image, (0, self.rect.y + self.rect.height))
-
-class Scenery:
-    def __init__(self):
-        # Load trees and bushes for enhanced greenery
-        self.trees = [load_image('tree.png', 1) for _ in range(5)]
-        self.bushes = [load_image('bush.png', 1) for _ in range(8)]
-        
-        # Position trees on both sides of the road
-        self.tree_positions = [(random.randint(20, 100), random.randint(0, SCREEN_HEIGHT)) for _ in range(5)]
-        self.tree_positions += [(random.randint(SCREEN_WIDTH - 120, SCREEN_WIDTH - 40), random.randint(0, SCREEN_HEIGHT)) for _ in range(5)]
-        
-        # Position bushes on both sides of the road
-        self.bush_positions = [(random.randint(30, 120), random.randint(0, SCREEN_HEIGHT)) for _ in range(8)]
-        self.bush_positions += [(random.randint(SCREEN_WIDTH - 140, SCREEN_WIDTH - 30), random.randint(0, SCREEN_HEIGHT)) for _ in range(8)]
-        
-        # Clouds in the sky
-        self.clouds = [load_image('cloud.png', 1) for _ in range(3)]
-        self.cloud_positions = [(random.randint(0, SCREEN_WIDTH), random.randint(0, 200)) for _ in range(3)]
-        
-        self.scroll_speed = 2
-        
-    def update(self):
-        # Update tree positions
-        for i in range(len(self.tree_positions)):
-            x, y = self.tree_positions[i]
-            y += self.scroll_speed
-            if y > SCREEN_HEIGHT:
-                if i < 5:  # Left side trees
-                    y = -100
-                    x = random.randint(20, 100)
-                else:  # Right side trees
-                    y = -100
-                    x = random.randint(SCREEN_WIDTH - 120, SCREEN_WIDTH - 40)
-            self.tree_positions[i] = (x, y)
-        
-        # Update bush positions
-        for i in range(len(self.bush_positions)):
-            x, y = self.bush_positions[i]
-            y += self.scroll_speed
-            if y > SCREEN_HEIGHT:
-                if i < 8:  # Left side bushes
-                    y = -50
-                    x = random.randint(30, 120)
-                else:  # Right side bushes
-                    y = -50
-                    x = random.randint(SCREEN_WIDTH - 140, SCREEN_WIDTH - 30)
-            self.bush_positions[i] = (x, y)
-            
-        # Update cloud positions
-        for i in range(len(self.cloud_positions)):
-            x, y = self.cloud_positions[i]
-            y += self.scroll_speed / 2  # Clouds move slower
-            if y > SCREEN_HEIGHT:
-                y = -100
-                x = random.randint(0, SCREEN_WIDTH)
-            self.cloud_positions[i] = (x, y)
-            
-    def draw(self, surface):
-        # Draw clouds
-        for i, cloud in enumerate(self.clouds):
-            surface.blit(cloud, self.cloud_positions[i])
-            
-        # Draw trees
-        for i, tree in enumerate(self.trees):
-            surface.blit(tree, self.tree_positions[i])
-            
-        # Draw bushes
-        for i, bush in enumerate(self.bushes):
-            surface.blit(bush, self.bush_positions[i])
+    return cache.sound(name)
+
+def create_window():
+    """Initialize pygame and open the game window"""
+    pygame.init()
+    mixer.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Kids Car Racing Adventure")
+    return screen
 
 class Game:
-    def __init__(self):
-        self.player = Player()
-        self.road = Road()
-        self.scenery = Scenery()
-        self.enemies = pygame.sprite.Group()
-        self.game_over = False
-        self.score = 0
-        self.level = 1
-        self.enemy_count = 2  # Reduced to 2 cars initially
-        self.heart_image = load_image('heart.png', 1)
+    """
+    Desktop front end: reads the keyboard, steps the RaceSimulation and
+    draws its state. main.py and web_main.py build on this class.
+
+    The simulation runs at a fixed STEPS_PER_SECOND while frames are drawn
+    at up to max_fps (0 or None for uncapped), interpolating positions
+    between the last two steps. Each frame is collected in a RenderQueue
+    (self.queue), so render() and the draw_* methods receive the queue and
+    set its layer before submitting. With use_dirty_rects, frames in which
+    the road stands still are recorded into a DisplayList and only the
+    changed parts of the screen are pushed.
+
+    With stream_music the background music is synthesized while playing
+    (music_stream.py); background_music.wav is only loaded as a fallback.
+
+    F3 attaches a FrameProfiler and shows its overlay; the recorded frames
+    are written to profile_trace when the game exits.
+
+    With adaptive_quality a QualityGovernor watches the work time of each
+    frame and switches between the QUALITY_PRESETS (self.quality); the
+    preset it settles on is remembered for this device.
+    """
+    game_over_message = "Game Over! Press SPACE to restart"
+    game_over_offset = 200
+    max_fps = 60
+    use_dirty_rects = False
+    profile_trace = 'frame_profile.csv'
+    stream_music = True
+    adaptive_quality = True
+
+    # Assets read by iter_load_assets(), keyed by the attribute they are stored in
+    images = {
+        'player_image': PLAYER_IMAGE,
+        'road_image': 'road.png',
+        'tree_image': 'tree.png',
+        'bush_image': 'bush.png',
+        'cloud_image': 'cloud.png',
+        'heart_image': 'heart.png',
+    }
+    sounds = {
+        'crash_sound': 'crash.wav',
+        'point_sound': 'point.wav',
+        'life_lost_sound': 'life_lost.wav',
+    }
+
+    def __init__(self, load=True):
+        self.screen = pygame.display.get_surface() or create_window()
+        self.timestep = FixedTimestep(max_fps=self.max_fps)
+        self.clock = self.timestep.clock
+        self.renderer = DirtyRenderer(self.screen) if self.use_dirty_rects else None
+        self.governor = QualityGovernor() if self.adaptive_quality else None
+        self.quality = self.governor.preset if self.governor else QUALITY_PRESETS[0]
+        self.queue = RenderQueue(self.screen.get_rect(), self.quality['render_scale'])
+        # What the queue draws into when rendering below full resolution
+        self.internal_surface = None
+        self.sim = RaceSimulation(masks=load_mask, scenery_density=self.quality['scenery_density'])
+        self.profiler = None
+        self.profiler_history = None
+        self.profile_lines = []
+        self.music = None
+        self.background_music = None
+        self.background = None
+        if load:
+            self.preload_assets()
+            self.start_music()
+            
+        # Font for text
+        self.font = pygame.font.Font(None, 36)
+        self.text = TextCache(self.font)
+
+    def iter_load_assets(self):
+        """Load the assets one at a time, yielding (loaded, total) after each"""
+        jobs = [(attr, load_image, name) for attr, name in self.images.items()]
+        jobs += [(None, load_image, name) for name in ENEMY_IMAGES]
+        jobs += [(attr, load_sound, name) for attr, name in self.sounds.items()]
         
-        # Load sounds
-        self.crash_sound = load_sound('crash.wav')
-        self.point_sound = load_sound('point.wav')
-        self.life_lost_sound = load_sound('life_lost.wav')
+        self.enemy_images = {}
+        for loaded, (attr, loader, name) in enumerate(jobs, 1):
+            asset = loader(name)
+            if attr is None:
+                self.enemy_images[name] = asset
+            else:
+                setattr(self, attr, asset)
+            yield loaded, len(jobs)
+        # Build the collision masks now rather than on the first crash
+        for name in [PLAYER_IMAGE] + ENEMY_IMAGES:
+            load_mask(name)
+        # Scenery images in the order of the simulation's kinds
+        self.scenery_images = [load_image(kind[0]) for kind in self.sim.scenery.kinds]
+        self.build_background()
+
+    def build_background(self):
+        """Set up the background compositor at the current render scale"""
+        scale = self.quality['render_scale']
+        width, height = self.screen.get_size()
+        self.background_images = [load_image(kind[0], scale) for kind in self.sim.scenery.kinds]
+        self.background = BackgroundCompositor(load_image('road.png', scale), self.ground_props,
+                                               (round(width * scale), round(height * scale)))
+
+    def preload_assets(self):
+        for _ in self.iter_load_assets():
+            pass
+
+    def start_music(self):
+        if not self.quality['music']:
+            return
+        if self.stream_music:
+            try:
+                from music_stream import MusicStreamer
+                self.music = MusicStreamer.create()
+            except ImportError as e:
+                print(f"Can't stream music: {e}")
+        if self.music:
+            self.music.start()
+            return
         
-        # Load and play background music
+        # Fall back to the pre-rendered track
         self.background_music = load_sound('background_music.wav')
         if self.background_music:
             self.background_music.play(-1)  # Loop indefinitely
-        
-        # Create initial enemies
-        for _ in range(self.enemy_count):
-            self.enemies.add(Enemy())
-            
-        # Font for text
-        self.font = pygame.font.Font(None, 36)
+
+    def stop_music(self):
+        if self.music:
+            self.music.stop()
+            self.music = None
+        if self.background_music:
+            self.background_music.stop()
+
+    def apply_quality(self, preset):
+        """Switch to another of the QUALITY_PRESETS"""
+        previous = self.quality
+        self.quality = preset
+        self.sim.set_scenery_density(preset['scenery_density'])
+        self.queue.set_scale(preset['render_scale'])
+        if self.background is not None:
+            self.build_background()
+        if self.renderer:
+            self.renderer.invalidate()
+        if preset['music'] and not previous['music']:
+            self.start_music()
+        elif previous['music'] and not preset['music']:
+            self.stop_music()
+
+    # Shortcuts to the simulation state
+    @property
+    def player(self):
+        return self.sim.player
+
+    @property
+    def enemies(self):
+        return self.sim.enemies
+
+    @property
+    def game_over(self):
+        return self.sim.game_over
+
+    @property
+    def score(self):
+        return self.sim.score
+
+    @property
+    def level(self):
+        return self.sim.level
         
     def handle_events(self):
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+            if not self.handle_event(event):
                 return False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return False
-                if event.key == pygame.K_SPACE and self.game_over:
-                    self.reset_game()
         return True
+
+    def handle_event(self, event):
+        """React to one event; returns False when the player quits"""
+        if event.type == pygame.QUIT:
+            return False
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return False
+            if event.key == pygame.K_SPACE and self.game_over:
+                self.reset_game()
+            if event.key == pygame.K_F3:
+                self.toggle_profiler()
+        return True
+
+    def toggle_profiler(self):
+        if self.profiler is None:
+            self.profiler = self.profiler_history or FrameProfiler()
+        else:
+            self.profiler_history = self.profiler
+            self.profiler = None
+        self.sim.profiler = self.profiler
     
     def update(self):
-        if not self.game_over:
-            self.player.update()
-            self.road.update()
-            self.scenery.update()
-            self.enemies.update()
-            
-            # Check for collisions
-            if not self.player.invulnerable:
-                for enemy in self.enemies:
-                    if pygame.sprite.collide_rect(self.player, enemy):
-                        self.player.lives -= 1
-                        
-                        # Play appropriate sound
-                        if self.player.lives <= 0:
-                            if self.crash_sound:
-                                self.crash_sound.play()
-                            self.game_over = True
-                        else:
-                            if self.life_lost_sound:
-                                self.life_lost_sound.play()
-                            self.player.make_invulnerable()
-                            
-                        # Reset enemy position
-                        enemy.rect.x = random.randint(150, SCREEN_WIDTH - 200)
-                        enemy.rect.y = random.randint(-500, -100)
-                    
-            # Update score
-            self.score += 1
-            if self.score % 1000 == 0:
-                if self.point_sound:
-                    self.point_sound.play()
-                self.level += 1
-                if self.level % 2 == 0 and self.enemy_count < 4:  # Add a new enemy every 2 levels, max 4
-                    self.enemy_count += 1
-                    self.enemies.add(Enemy())
-    
-    def draw(self):
-        # Fill background
-        screen.fill((135, 206, 235))  # Sky blue
+        keys = pygame.key.get_pressed()
+        events = self.sim.step(keys[pygame.K_LEFT], keys[pygame.K_RIGHT])
+        self.play_sounds(events)
+
+    def play_sounds(self, events):
+        sounds = {
+            EVENT_CRASH: self.crash_sound,
+            EVENT_LIFE_LOST: self.life_lost_sound,
+            EVENT_LEVEL_UP: self.point_sound,
+        }
+        for event in events:
+            if sounds[event]:
+                sounds[event].play()
+
+    def ground_props(self, top, bottom):
+        """The trees and bushes on background rows [top, bottom), at the render scale"""
+        scale = self.quality['render_scale']
+        scenery = self.sim.scenery
+        distance = self.sim.road.distance
+        # A row more on each side, for the rounding of scaled positions
+        hits = scenery.ground_rows(math.floor(top / scale) - 1, math.ceil(bottom / scale) + 1, distance)
+        images = [self.background_images[kind] for kind in scenery.kind[hits].tolist()]
+        xs = np.rint(scenery.x[hits] * scale).astype(int)
+        vs = np.rint((scenery.y[hits] - distance) * scale).astype(int)
+        return zip(images, xs.tolist(), vs.tolist())
+
+    def draw_world(self, queue, alpha=1.0):
+        sim = self.sim
+        scenery = sim.scenery
+        if sim.game_over:
+            alpha = 1.0  # Nothing moves any more
         
-        # Draw scenery
-        self.scenery.draw(screen)
+        # Draw the road with the trees and bushes beside it, which the
+        # compositor keeps at the render scale already
+        queue.layer = LAYER_BACKGROUND
+        distance = interpolate(sim.road.prev_distance, sim.road.distance, alpha)
+        for image, dest, area in self.background.views(distance * self.quality['render_scale']):
+            queue.submit(image, dest, area=area, native=True)
         
-        # Draw road
-        self.road.draw(screen)
+        # Draw the clouds drifting over it
+        if self.quality['clouds']:
+            queue.layer = LAYER_CLOUDS
+            floating = np.flatnonzero(~scenery.ground)
+            images = [self.scenery_images[kind] for kind in scenery.kind[floating].tolist()]
+            prev_y = scenery.prev_y[floating]
+            ys = prev_y + (scenery.y[floating] - prev_y) * alpha
+            queue.blits(zip(images, zip(scenery.x[floating].tolist(), ys.tolist())))
         
         # Draw player
-        self.player.draw(screen)
+        queue.layer = LAYER_CARS
+        player = sim.player
+        if player.visible:
+            queue.blit(self.player_image, (interpolate(player.prev_x, player.rect.x, alpha), player.rect.y))
         
-        # Draw enemies
-        for enemy in self.enemies:
-            enemy.draw(screen)
-            
+        # Draw enemies; the ones still waiting above the screen are culled
+        for enemy in sim.enemies:
+            queue.blit(self.enemy_images[enemy.image_name],
+                       (enemy.rect.x, interpolate(enemy.prev_y, enemy.rect.y, alpha)))
+
+    def draw_hud(self, surface):
         # Draw score
-        score_text = self.font.render(f"Score: {self.score}", True, BLACK)
-        screen.blit(score_text, (10, 10))
+        self.text.draw_number(surface, "Score: ", self.score, BLACK, (10, 10))
         
         # Draw level
-        level_text = self.font.render(f"Level: {self.level}", True, BLACK)
-        screen.blit(level_text, (10, 50))
+        self.text.draw_number(surface, "Level: ", self.level, BLACK, (10, 50))
         
         # Draw lives
         for i in range(self.player.lives):
-            screen.blit(self.heart_image, (SCREEN_WIDTH - 40 - i * 35, 10))
+            surface.blit(self.heart_image, (SCREEN_WIDTH - 40 - i * 35, 10))
         
         # Draw game over message
         if self.game_over:
-            game_over_text = self.font.render("Game Over! Press SPACE to restart", True, RED)
-            screen.blit(game_over_text, (SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2))
-            
-        pygame.display.flip()
+            game_over_text = self.text.render(self.game_over_message, RED)
+            surface.blit(game_over_text, (SCREEN_WIDTH // 2 - self.game_over_offset, SCREEN_HEIGHT // 2))
+    
+    def render(self, queue):
+        self.draw_world(queue, self.timestep.alpha)
+        queue.layer = LAYER_HUD
+        self.draw_hud(queue)
+        if self.profiler:
+            queue.layer = LAYER_OVERLAY
+            self.draw_profiler(queue)
+
+    def draw_profiler(self, surface):
+        # Refresh the numbers twice a second so they can be read
+        if not self.profile_lines or self.profiler.index % 30 == 0:
+            self.profile_lines = self.profiler.overlay_lines()
+            self.profile_lines.append(f"draws {self.queue.submitted}  culled {self.queue.culled}")
+        for i, line in enumerate(self.profile_lines):
+            surface.blit(self.text.render(line, BLACK), (10, 160 + i * 26))
+
+    def draw(self):
+        self.render(self.queue)
+        if self.queue.scale != 1:
+            # Draw at the internal resolution, then scale up to the window
+            size = self.background.size
+            if self.internal_surface is None or self.internal_surface.get_size() != size:
+                self.internal_surface = pygame.Surface(size).convert()
+            self.queue.flush(self.internal_surface)
+            pygame.transform.scale(self.internal_surface, self.screen.get_size(), self.screen)
+            pygame.display.flip()
+        elif self.renderer and not self.background.rendered_rows:
+            # The road stood still (game over): push only what changed
+            frame = DisplayList()
+            self.queue.flush(frame)
+            self.renderer.present(frame)
+        else:
+            # While the road scrolls every pixel changes; diffing would only add work
+            self.queue.flush(self.screen)
+            pygame.display.flip()
+            if self.renderer:
+                self.renderer.invalidate()
         
     def reset_game(self):
-        self.player = Player()
-        self.enemies.empty()
-        for _ in range(self.enemy_count):
-            self.enemies.add(Enemy())
-        self.game_over = False
-        self.score = 0
-        self.level = 1
-        self.enemy_count = 2  # Reset to 2 cars
+        """Restart the race; the simulation reuses its player and pooled enemies"""
+        self.sim.reset()
+
+    def frame(self):
+        """
+        Run one render frame: handle input, run the simulation steps that
+        are due and draw. Returns False once the player quits.
+        """
+        frame_start = perf_counter()
+        profiler = self.profiler
+        if profiler:
+            profiler.begin_frame()
+        running = self.handle_events()
+        if profiler:
+            profiler.lap('handle_events')
+        if self.music:
+            self.music.update()
         
-    def run(self):
-        running = True
-        while running:
-            running = self.handle_events()
+        wait_start = perf_counter()
+        steps = self.timestep.tick()
+        wait = perf_counter() - wait_start
+        if profiler:
+            profiler.lap('wait')
+            start = perf_counter()
+        for _ in range(steps):
             self.update()
-            self.draw()
-            clock.tick(60)
+        if profiler:
+            profiler.add('update', perf_counter() - start)
+            start = perf_counter()
         
+        self.draw()
+        if profiler:
+            profiler.add('draw', perf_counter() - start)
+            profiler.end_frame()
+        if self.governor:
+            preset = self.governor.record(perf_counter() - frame_start - wait)
+            if preset:
+                self.apply_quality(preset)
+        return running
+
+    def shutdown(self):
         # Stop music when game ends
-        if self.background_music:
-            self.background_music.stop()
+        self.stop_music()
+        
+        # Keep the timings of the session
+        profiler = self.profiler or self.profiler_history
+        if profiler and profiler.count and self.profile_trace:
+            profiler.export(self.profile_trace)
+        
+    def run(self):
+        running = True
+        while running:
+            running = self.frame()
         
+        self.shutdown()
         pygame.quit()
         sys.exit()
 
 # Run the game
 if __name__ == "__main__":
     game = Game()
-    game.run()
\ No newline at end of file
+    game.run()
@@ -1,63 +1,153 @@
-import pygame
+import argparse
+import hashlib
+import json
 import os
-from assets.images.player_car import create_player_car, create_lamborghini_car
-from assets.images.enemy_cars import create_enemy_car
-from assets.images.scenery import create_road, create_tree, create_cloud, create_bush
-
-# Initialize pygame
-pygame.init()
-
-# Create directories if they don't exist
-os.makedirs(os.path.join('assets', 'images'), exist_ok=True)
-os.makedirs(os.path.join('assets', 'sounds'), exist_ok=True)
-
-# Generate and save player car
-player_car = create_player_car()
-pygame.image.save(player_car, os.path.join('assets', 'images', 'player_car.png'))
-
-# Generate and save Lamborghini car
-lamborghini = create_lamborghini_car()
-pygame.image.save(lamborghini, os.path.join('assets', 'images', 'lamborghini.png'))
-
-# Generate and save enemy cars
-enemy_car1 = create_enemy_car((0, 0, 255))  # Blue
-pygame.image.save(enemy_car1, os.path.join('assets', 'images', 'enemy_car1.png'))
-
-enemy_car2 = create_enemy_car((0, 255, 0))  # Green
-pygame.image.save(enemy_car2, os.path.join('assets', 'images', 'enemy_car2.png'))
-
-enemy_car3 = create_enemy_car((255, 165, 0))  # Orange
-pygame.image.save(enemy_car3, os.path.join('assets', 'images', 'enemy_car3.png'))
-
-# Generate and save road
-road = create_road()
-pygame.image.save(road, os.path.join('assets', 'images', 'road.png'))
-
-# Generate and save tree
-tree = create_tree()
-pygame.image.save(tree, os.path.join('assets', 'images', 'tree.png'))
-
-# Generate and save bush
-bush = create_bush()
-pygame.image.save(bush, os.path.join('assets', 'images', 'bush.png'))
-
-# Generate and save cloud
-cloud = create_cloud()
-pygame.image.save(cloud, os.path.join('assets', 'images', 'cloud.png'))
-
-# Generate and save heart (for lives)
-heart_surface = pygame.Surface((30, 30), pygame.SRCALPHA)
-# Draw a heart shape
-pygame.draw.polygon(heart_surface, (255, 0, 0), [
-    (15, 27),  # Bottom point
-    (5, 15),   # Left middle
-    (0, 8),    # Left top
-    (7, 0),    # Left curve
-    (15, 7),   # Middle top
-    (23, 0),   # Right curve
-    (30, 8),   # Right top
-    (25, 15)   # Right middle
-])
-pygame.image.save(heart_surface, os.path.join('assets', 'images', 'heart.png'))
-
-print("All game assets have been generated successfully!")
\ No newline at end of file
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+# Generates the game images with the builders in assets/images. Each
+# output is tagged with a hash of its builder's source file, the builder
+# name and its arguments; only outputs whose hash changed (or that are
+# missing) are rebuilt, independent builders run in a process pool, and
+# every file is written atomically.
+#
+#   python generate_assets.py             rebuild what is out of date
+#   python generate_assets.py --force     rebuild everything
+#   python generate_assets.py --adopt     record the current images as up to date
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_DIR = os.path.join(BASE_DIR, 'assets', 'images')
+HASH_FILE = os.path.join(BASE_DIR, 'assets', 'asset_hashes.json')
+
+# Bump to force every asset to be rebuilt
+GENERATOR_VERSION = 1
+
+
+# Output file -> (builder module, builder function, arguments)
+ASSETS = {
+    'player_car.png': ('assets.images.player_car', 'create_player_car', ()),
+    'lamborghini.png': ('assets.images.player_car', 'create_lamborghini_car', ()),
+    'enemy_car1.png': ('assets.images.enemy_cars', 'create_enemy_car', ((0, 0, 255),)),    # Blue
+    'enemy_car2.png': ('assets.images.enemy_cars', 'create_enemy_car', ((0, 255, 0),)),    # Green
+    'enemy_car3.png': ('assets.images.enemy_cars', 'create_enemy_car', ((255, 165, 0),)),  # Orange
+    'road.png': ('assets.images.scenery', 'create_road', ()),
+    'tree.png': ('assets.images.scenery', 'create_tree', ()),
+    'bush.png': ('assets.images.scenery', 'create_bush', ()),
+    'cloud.png': ('assets.images.scenery', 'create_cloud', ()),
+    'heart.png': ('assets.images.hud', 'create_heart', ()),
+}
+
+
+def module_path(module):
+    return os.path.join(BASE_DIR, *module.split('.')) + '.py'
+
+def asset_hash(name):
+    module, function, args = ASSETS[name]
+    digest = hashlib.sha256()
+    with open(module_path(module), 'rb') as f:
+        # The same source whether git checked it out with LF or CRLF
+        digest.update(f.read().replace(b'\r\n', b'\n'))
+    digest.update(repr((GENERATOR_VERSION, name, function, args)).encode())
+    return digest.hexdigest()
+
+def load_hashes():
+    try:
+        with open(HASH_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_hashes(hashes):
+    tmp_path = HASH_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, HASH_FILE)
+
+def stale_assets(names=None, force=False):
+    """Names of the outputs that are missing or were built from other sources"""
+    hashes = load_hashes()
+    stale = []
+    for name in names or ASSETS:
+        if (force or hashes.get(name) != asset_hash(name)
+                or not os.path.exists(os.path.join(IMAGE_DIR, name))):
+            stale.append(name)
+    return stale
+
+def build_asset(name):
+    """Run one builder and atomically write its image. Runs in a worker process."""
+    import importlib
+
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    module, function, args = ASSETS[name]
+    builder = getattr(importlib.import_module(module), function)
+
+    # Seed the builders' random details so a rebuild is reproducible
+    digest = asset_hash(name)
+    random.seed(f"{name}:{digest}")
+    surface = builder(*args)
+
+    path = os.path.join(IMAGE_DIR, name)
+    tmp_path = os.path.join(IMAGE_DIR, f".tmp-{os.getpid()}-{name}")
+    pygame.image.save(surface, tmp_path)
+    os.replace(tmp_path, path)
+    return name, digest
+
+def generate_assets(names=None, force=False, workers=None):
+    """Rebuild the stale images and return the names that were rebuilt"""
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    os.makedirs(os.path.join(BASE_DIR, 'assets', 'sounds'), exist_ok=True)
+
+    stale = stale_assets(names, force)
+    if not stale:
+        return []
+
+    hashes = load_hashes()
+    if len(stale) == 1 or workers == 1:
+        results = [build_asset(name) for name in stale]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(build_asset, stale))
+    for name, digest in results:
+        hashes[name] = digest
+        print(f"Generated {name}")
+    save_hashes(hashes)
+    return stale
+
+def adopt_assets():
+    """Record the images on disk as up to date with the current builders"""
+    hashes = load_hashes()
+    for name in ASSETS:
+        if os.path.exists(os.path.join(IMAGE_DIR, name)):
+            hashes[name] = asset_hash(name)
+    save_hashes(hashes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the game images, rebuilding only what changed")
+    parser.add_argument('names', nargs='*', metavar='NAME', help="only consider these outputs")
+    parser.add_argument('--force', action='store_true', help="rebuild even if up to date")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes")
+    parser.add_argument('--adopt', action='store_true',
+                        help="mark the existing images as up to date without rebuilding")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in ASSETS]
+    if unknown:
+        parser.error(f"unknown asset(s): {', '.join(unknown)}")
+
+    if args.adopt:
+        adopt_assets()
+        print("Recorded the current images as up to date")
+        return
+
+    rebuilt = generate_assets(args.names, args.force, args.jobs)
+    if rebuilt:
+        print(f"All game assets have been generated successfully! ({len(rebuilt)} rebuilt)")
+    else:
+        print("All game assets are up to date")
+
+if __name__ == "__main__":
+    main()
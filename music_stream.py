@@ -0,0 +1,59 @@
+import numpy as np
+import pygame
+from sound_generator import render_music_block, music_peak
+
+# Plays the background music without the 1.7 MB background_music.wav. The
+# note patterns of sound_generator are synthesized a small block at a
+# time, just ahead of playback, and queued on a mixer channel reserved
+# for the music.
+
+MUSIC_CHANNEL = 0
+BLOCK_SECONDS = 0.25
+
+
+class MusicStreamer:
+    def __init__(self, sample_rate, channels, volume=1.0):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_frames = int(BLOCK_SECONDS * sample_rate)
+        self.gain = volume / music_peak(sample_rate)
+        self.position = 0
+
+        # Keep Sound.play() from ever picking the music channel
+        pygame.mixer.set_reserved(MUSIC_CHANNEL + 1)
+        self.channel = pygame.mixer.Channel(MUSIC_CHANNEL)
+
+    @classmethod
+    def create(cls):
+        """Return a streamer for the current mixer, or None if it can't stream"""
+        init = pygame.mixer.get_init()
+        if not init:
+            return None
+        sample_rate, size, channels = init
+        if size != -16:
+            return None  # Blocks are rendered as signed 16-bit samples
+        return cls(sample_rate, channels)
+
+    def next_block(self):
+        mono = render_music_block(self.position, self.block_frames, self.sample_rate)
+        self.position += self.block_frames
+        pcm = (mono * (self.gain * 32767)).astype(np.int16)
+        if self.channels > 1:
+            pcm = np.repeat(pcm[:, None], self.channels, axis=1)
+        return pygame.mixer.Sound(buffer=pcm.tobytes())
+
+    def start(self):
+        self.position = 0
+        self.channel.play(self.next_block())
+        self.channel.queue(self.next_block())
+
+    def update(self):
+        """Call once per frame: keeps one block queued behind the playing one"""
+        if not self.channel.get_busy():
+            # Starved (the tab was in the background): start again from here
+            self.channel.play(self.next_block())
+        if self.channel.get_queue() is None:
+            self.channel.queue(self.next_block())
+
+    def stop(self):
+        self.channel.stop()
@@ -0,0 +1,111 @@
+import csv
+import json
+from time import perf_counter
+
+# Per-frame timing. The game and the simulation call lap(name) after each
+# subsystem when a profiler is attached; when none is attached the hooks
+# are a single `if` on None, so a disabled profiler costs next to nothing.
+
+
+class FrameProfiler:
+    """
+    Keeps the last capacity frames of timings (in seconds) in ring buffers:
+    the total frame time and the time spent in each named section.
+    """
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.frame_times = [0.0] * capacity
+        self.sections = {}
+        self.index = 0
+        self.count = 0
+        self.current = {}
+        self._frame_start = 0.0
+        self._mark = 0.0
+
+    def begin_frame(self):
+        self._frame_start = self._mark = perf_counter()
+        self.current = {}
+
+    def lap(self, name):
+        """Charge the time since the previous lap (or frame start) to name"""
+        now = perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def end_frame(self):
+        i = self.index
+        self.frame_times[i] = perf_counter() - self._frame_start
+        for name in self.sections.keys() | self.current.keys():
+            buffer = self.sections.get(name)
+            if buffer is None:
+                buffer = self.sections[name] = [0.0] * self.capacity
+            buffer[i] = self.current.get(name, 0.0)
+        self.index = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _ordered(self, buffer):
+        """Buffer contents from the oldest to the newest recorded frame"""
+        if self.count < self.capacity:
+            return buffer[:self.count]
+        return buffer[self.index:] + buffer[:self.index]
+
+    def percentile(self, p):
+        times = sorted(self._ordered(self.frame_times))
+        if not times:
+            return 0.0
+        return times[min(len(times) - 1, int(p / 100 * len(times)))]
+
+    def fps(self):
+        if not self.count:
+            return 0.0
+        mean = sum(self._ordered(self.frame_times)) / self.count
+        return 1.0 / mean if mean else 0.0
+
+    def summary(self):
+        """FPS, frame time percentiles and mean time per section, in ms"""
+        sections = {name: sum(self._ordered(buffer)) / max(self.count, 1) * 1000
+                    for name, buffer in self.sections.items()}
+        return {
+            'frames': self.count,
+            'fps': self.fps(),
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'sections_ms': sections,
+        }
+
+    def overlay_lines(self):
+        summary = self.summary()
+        lines = [
+            f"FPS {summary['fps']:.0f}",
+            f"p50 {summary['p50_ms']:.1f}  p95 {summary['p95_ms']:.1f}  p99 {summary['p99_ms']:.1f} ms",
+        ]
+        for name, ms in sorted(summary['sections_ms'].items()):
+            lines.append(f"{name} {ms:.2f} ms")
+        return lines
+
+    def export(self, path):
+        """Write the recorded frames to path as CSV, or JSON if it ends in .json"""
+        names = sorted(self.sections)
+        frames = self._ordered(self.frame_times)
+        columns = [self._ordered(self.sections[name]) for name in names]
+        if path.endswith('.json'):
+            trace = {
+                'summary': self.summary(),
+                'frames': [
+                    dict(frame_ms=frame * 1000, **{f"{name}_ms": column[i] * 1000 for name, column in zip(names, columns)})
+                    for i, frame in enumerate(frames)
+                ],
+            }
+            with open(path, 'w') as f:
+                json.dump(trace, f, indent=2)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame_ms'] + [f"{name}_ms" for name in names])
+                for i, frame in enumerate(frames):
+                    writer.writerow([f"{frame * 1000:.4f}"] + [f"{column[i] * 1000:.4f}" for column in columns])
+        print(f"Wrote frame profile to {path}")
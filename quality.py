@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+from collections import deque
+
+# Adaptive quality. The same build runs on gaming PCs and budget phones,
+# so instead of one fixed workload the game watches how long each frame's
+# work takes (events, simulation, drawing; not the time spent waiting for
+# the next frame) and steps through QUALITY_PRESETS: down as soon as a
+# window of frames goes over budget, back up only after a long stretch
+# with plenty of headroom. Each bounce doubles that stretch, so a device
+# sitting on the edge settles instead of flip-flopping. The preset a
+# device ends up with is remembered for the next session (localStorage in
+# the browser, a JSON file in the home directory elsewhere).
+
+# Best first. scenery_density scales the roadside props, render_scale is
+# the internal resolution the frame is drawn at before being scaled up to
+# the window, hud_extras are main.py's Players Online and Total Plays
+# counters (score, level and lives are always shown). No preset lowers
+# render_scale: the background is already a single blit, so scaling the
+# frame up costs more than drawing it at full size (benchmark.py measured
+# a half-resolution "minimal" slower than "low").
+QUALITY_PRESETS = [
+    {'name': 'high', 'scenery_density': 1.0, 'clouds': True, 'hud_extras': True,
+     'render_scale': 1.0, 'music': True},
+    {'name': 'medium', 'scenery_density': 0.5, 'clouds': True, 'hud_extras': True,
+     'render_scale': 1.0, 'music': True},
+    {'name': 'low', 'scenery_density': 0.5, 'clouds': False, 'hud_extras': False,
+     'render_scale': 1.0, 'music': True},
+    {'name': 'minimal', 'scenery_density': 0.25, 'clouds': False, 'hud_extras': False,
+     'render_scale': 1.0, 'music': False},
+]
+
+TARGET_FPS = 60
+# Frames averaged for each decision
+WINDOW_FRAMES = 60
+# Share of the frame budget above which the preset is lowered...
+DOWNGRADE_LOAD = 0.85
+# ...and below which it has to stay for UPGRADE_FRAMES to be raised again
+UPGRADE_LOAD = 0.5
+UPGRADE_FRAMES = 5 * TARGET_FPS
+MAX_UPGRADE_FRAMES = 120 * TARGET_FPS
+
+PREFERENCES_FILE = os.path.join(os.path.expanduser('~'), '.kids_car_racing_quality.json')
+STORAGE_KEY = 'kids_car_racing_quality'
+
+
+def preset_index(name, presets=QUALITY_PRESETS):
+    for index, preset in enumerate(presets):
+        if preset['name'] == name:
+            return index
+    return None
+
+def device_id():
+    """Identifies this device (and browser) in the saved choices"""
+    if sys.platform == 'emscripten':
+        import platform  # pygbag's, which exposes the page's window
+        window = platform.window
+        return f"{window.navigator.userAgent} {window.screen.width}x{window.screen.height}"
+    import platform
+    return f"{platform.node()} {platform.system()} {platform.machine()}"
+
+def load_choices():
+    """{device id: preset name} saved on this machine"""
+    try:
+        if sys.platform == 'emscripten':
+            import platform
+            text = platform.window.localStorage.getItem(STORAGE_KEY)
+        else:
+            with open(PREFERENCES_FILE) as f:
+                text = f.read()
+        return json.loads(text) if text else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def save_choice(name):
+    choices = load_choices()
+    choices[device_id()] = name
+    text = json.dumps(choices, sort_keys=True)
+    try:
+        if sys.platform == 'emscripten':
+            import platform
+            platform.window.localStorage.setItem(STORAGE_KEY, text)
+        else:
+            tmp_path = PREFERENCES_FILE + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, PREFERENCES_FILE)
+    except (OSError, AttributeError) as e:
+        print(f"Can't save the quality preset: {e}")
+
+
+class QualityGovernor:
+    """
+    Chooses a preset (an index into presets, 0 the best) from the frame
+    work times passed to record(). With remember, the starting preset is
+    the one saved for this device and every change is saved.
+    """
+    def __init__(self, presets=QUALITY_PRESETS, target_fps=TARGET_FPS, remember=True):
+        self.presets = presets
+        self.budget = 1.0 / target_fps
+        self.remember = remember
+        self.level = 0
+        if remember:
+            saved = preset_index(load_choices().get(device_id()), presets)
+            if saved is not None:
+                self.level = saved
+        self.times = deque(maxlen=WINDOW_FRAMES)
+        self.total = 0.0
+        self.calm_frames = 0
+        self.upgrade_frames = UPGRADE_FRAMES
+        self.last_change = None
+
+    @property
+    def preset(self):
+        return self.presets[self.level]
+
+    def record(self, frame_time):
+        """Add one frame's work time; returns the new preset when it changes, else None"""
+        if len(self.times) == self.times.maxlen:
+            self.total -= self.times[0]
+        self.times.append(frame_time)
+        self.total += frame_time
+        if len(self.times) < self.times.maxlen:
+            return None
+
+        load = self.total / len(self.times) / self.budget
+        if load > DOWNGRADE_LOAD and self.level < len(self.presets) - 1:
+            if self.last_change == 'up':
+                # The better preset didn't hold: wait twice as long next time
+                self.upgrade_frames = min(self.upgrade_frames * 2, MAX_UPGRADE_FRAMES)
+            return self.change(self.level + 1, 'down')
+        if load < UPGRADE_LOAD:
+            self.calm_frames += 1
+            if self.calm_frames >= self.upgrade_frames and self.level > 0:
+                return self.change(self.level - 1, 'up')
+        else:
+            self.calm_frames = 0
+        return None
+
+    def change(self, level, direction):
+        self.level = level
+        self.last_change = direction
+        # Judge the new preset on its own frames only
+        self.times.clear()
+        self.total = 0.0
+        self.calm_frames = 0
+        if self.remember:
+            save_choice(self.preset['name'])
+        return self.preset
@@ -0,0 +1,99 @@
+import pygame
+
+# Central render queue. Every part of a frame (background, clouds, cars,
+# HUD, overlays) submits (image, position, layer) items here instead of
+# blitting straight away. The queue drops anything entirely outside the
+# viewport (cars waiting above the screen, props that scrolled off),
+# sorts the rest by layer and hands them to the target surface in a
+# single Surface.blits() call. It counts the submitted and culled items
+# of each frame.
+#
+# It can stand in for a surface: blit() and blits() submit at the current
+# layer, so drawing code written for a Surface works unchanged.
+#
+# With a scale below 1 the items are drawn at that internal resolution:
+# positions are scaled and every image is replaced by a scaled copy, made
+# once per image. Native items are already at the internal resolution.
+
+LAYER_BACKGROUND = 0
+LAYER_CLOUDS = 1
+LAYER_CARS = 2
+LAYER_HUD = 3
+LAYER_OVERLAY = 4
+
+MAX_SCALED_IMAGES = 256
+
+
+class RenderQueue:
+    def __init__(self, viewport, scale=1.0):
+        self.viewport = pygame.Rect(viewport)
+        self.scale = scale
+        self.layer = LAYER_BACKGROUND
+        # (layer, image, dest, area, native) in submission order
+        self.items = []
+        # image -> its copy at scale
+        self.scaled_images = {}
+        self.pending_culled = 0
+        # Counts of the last flushed frame
+        self.submitted = 0
+        self.culled = 0
+
+    def submit(self, image, dest, layer=None, area=None, native=False):
+        if isinstance(dest, pygame.Rect):
+            x, y = dest.topleft
+        else:
+            x, y = dest
+        if native:
+            self.items.append((self.layer if layer is None else layer, image, (x, y), area, True))
+            return
+        if area is None:
+            width, height = image.get_size()
+        else:
+            width, height = area[2], area[3]
+        viewport = self.viewport
+        if (x >= viewport.right or y >= viewport.bottom
+                or x + width <= viewport.x or y + height <= viewport.y):
+            self.pending_culled += 1
+            return
+        self.items.append((self.layer if layer is None else layer, image, (x, y), area, False))
+
+    def blit(self, image, dest, area=None):
+        self.submit(image, dest, area=area)
+
+    def blits(self, sequence, doreturn=True):
+        for item in sequence:
+            self.submit(item[0], item[1], area=item[2] if len(item) > 2 else None)
+
+    def flush(self, surface):
+        """Draw the queued items onto surface, lowest layer first, and empty the queue"""
+        items = self.items
+        # A stable sort keeps the submission order within each layer
+        items.sort(key=lambda item: item[0])
+        if self.scale == 1:
+            surface.blits([(image, dest, area) for _, image, dest, area, _ in items], doreturn=False)
+        else:
+            surface.blits([(image, dest, area) if native else self.scale_item(image, dest, area)
+                           for _, image, dest, area, native in items], doreturn=False)
+        self.submitted = len(items) + self.pending_culled
+        self.culled = self.pending_culled
+        self.items = []
+        self.pending_culled = 0
+
+    def scale_item(self, image, dest, area):
+        scale = self.scale
+        scaled = self.scaled_images.get(image)
+        if scaled is None:
+            if len(self.scaled_images) >= MAX_SCALED_IMAGES:
+                self.scaled_images.clear()  # Mostly text that is gone by now
+            width, height = image.get_size()
+            scaled = pygame.transform.scale(image, (max(1, round(width * scale)),
+                                                    max(1, round(height * scale))))
+            self.scaled_images[image] = scaled
+        if area is not None:
+            area = [round(value * scale) for value in area]
+        return scaled, (dest[0] * scale, dest[1] * scale), area
+
+    def set_scale(self, scale):
+        if scale != self.scale:
+            self.scale = scale
+            self.scaled_images.clear()
@@ -3,6 +3,7 @@ import sys
 import subprocess
 import shutil
 import webbrowser
+import static_server
 import time
 
 def check_requirements():
@@ -52,28 +53,17 @@ def start_local_server():
         print("Error: Build directory not found. Please build the game first.")
         return False
     
-    # Change to the build directory
-    os.chdir(build_dir)
-    
     # Determine an available port
     port = 8000
     
-    print(f"Starting server at http://localhost:{port}")
-    print("Press Ctrl+C to stop the server")
-    
     # Open the browser
     webbrowser.open(f"http://localhost:{port}")
     
     # Start the server
     try:
-        # Use the http.server module
-        server_command = [sys.executable, "-m", "http.server", str(port)]
-        subprocess.run(server_command)
-        return True
-    except KeyboardInterrupt:
-        print("\nServer stopped")
+        static_server.serve(build_dir, port)
         return True
-    except Exception as e:
+    except OSError as e:
         print(f"Error starting server: {e}")
         return False
 
@@ -94,8 +84,7 @@ def main():
         start_local_server()
     else:
         print("\nTo test the game later, run:")
-        print("cd build/web")
-        print("python -m http.server 8000")
+        print("python static_server.py")
         print("And open http://localhost:8000 in your browser")
     
     print("\n===== Deployment Instructions =====")
@@ -1,7 +1,6 @@
 import os
-import sys
 import webbrowser
-import subprocess
+import static_server
 
 def create_standalone_html():
     """Create a standalone HTML file with the game"""
@@ -428,28 +427,17 @@ def start_local_server():
         print(f"Error: Build directory not found at {build_dir}")
         return False
     
-    # Change to the build directory
-    os.chdir(build_dir)
-    
     # Determine an available port
     port = 8000
     
-    print(f"Starting server at http://localhost:{port}")
-    print("Press Ctrl+C to stop the server")
-    
     # Open the browser
     webbrowser.open(f"http://localhost:{port}")
     
     # Start the server
     try:
-        # Use the http.server module
-        server_command = [sys.executable, "-m", "http.server", str(port)]
-        subprocess.run(server_command)
-        return True
-    except KeyboardInterrupt:
-        print("\nServer stopped")
+        static_server.serve(build_dir, port)
         return True
-    except Exception as e:
+    except OSError as e:
         print(f"Error starting server: {e}")
         return False
 
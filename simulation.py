@@ -0,0 +1,492 @@
+import random
+import numpy as np
+import pygame
+from collision_index import SpatialHash
+
+# Headless simulation of the race. Nothing in this module touches the
+# display, the mixer or the keyboard, so it can be stepped thousands of
+# times per second on machines without SDL video or audio. The front ends
+# (game.py, main.py, web_main.py) read keys, feed them into step() and draw
+# the resulting state.
+
+# The simulation advances in fixed steps; every speed below is in pixels
+# per step and every timer counts steps
+STEPS_PER_SECOND = 60
+
+# Game world dimensions
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+
+# Road edges the cars have to stay within
+ROAD_LEFT = 150
+ROAD_RIGHT = SCREEN_WIDTH - 150
+
+# Sprite sizes, matching the images written by generate_assets.py
+PLAYER_SIZE = (70, 140)
+ENEMY_SIZE = (60, 120)
+TREE_SIZE = (100, 150)
+BUSH_SIZE = (60, 40)
+CLOUD_SIZE = (150, 80)
+ROAD_HEIGHT = 800
+
+# Trees and bushes stand beside the road, so they scroll with it; the
+# clouds drift by slower
+ROAD_SCROLL_SPEED = 5
+CLOUD_SPEED = 1
+
+# Scenery kinds: (image, size, where, speed, count). Roadside props come
+# count to each side of the road, on the grass; sky props go anywhere.
+ROADSIDE = 'roadside'
+SKY = 'sky'
+SCENERY_KINDS = [
+    ('tree.png', TREE_SIZE, ROADSIDE, ROAD_SCROLL_SPEED, 5),
+    ('bush.png', BUSH_SIZE, ROADSIDE, ROAD_SCROLL_SPEED, 8),
+    ('cloud.png', CLOUD_SIZE, SKY, CLOUD_SPEED, 3),
+]
+SIDE_LEFT = -1
+SIDE_ANY = 0
+SIDE_RIGHT = 1
+
+PLAYER_IMAGE = 'lamborghini.png'
+ENEMY_IMAGES = ['enemy_car1.png', 'enemy_car2.png', 'enemy_car3.png']
+
+# Enemy spawn area and speed range
+ENEMY_MIN_X = ROAD_LEFT
+ENEMY_MAX_X = SCREEN_WIDTH - 200
+ENEMY_MIN_Y = -500
+ENEMY_MAX_Y = -100
+ENEMY_MIN_SPEED = 3
+ENEMY_MAX_SPEED = 7
+
+# Tries to find a free spot for an enemy when spawns must not overlap
+SPAWN_ATTEMPTS = 8
+
+# Below this many enemies testing every car is cheaper than keeping them
+# in a spatial hash (a query costs about as much as 60 rect tests)
+BROADPHASE_MIN_ENEMIES = 64
+
+# "Rush hour": hundreds of cars spread over a spawn band tall enough that
+# they cover about RUSH_HOUR_DENSITY of the road
+RUSH_HOUR_ENEMY_COUNT = 200
+RUSH_HOUR_DENSITY = 0.3
+
+# Difficulty settings
+START_LIVES = 4
+START_ENEMY_COUNT = 2
+MAX_ENEMY_COUNT = 4
+POINTS_PER_LEVEL = 1000
+INVULNERABLE_FRAMES = 2 * STEPS_PER_SECOND
+
+# Events returned by RaceSimulation.step() so front ends can play sounds
+EVENT_LIFE_LOST = 'life_lost'
+EVENT_CRASH = 'crash'
+EVENT_LEVEL_UP = 'level_up'
+
+
+class Player:
+    def __init__(self):
+        self.rect = pygame.Rect((0, 0), PLAYER_SIZE)
+        self.reset()
+
+    def reset(self):
+        """Back to the start line with full lives, reusing the same rect"""
+        self.rect.centerx = SCREEN_WIDTH // 2
+        self.rect.bottom = SCREEN_HEIGHT - 20
+        self.prev_x = self.rect.x
+        self.speed = 6  # Slightly faster for a Lamborghini
+        self.lives = START_LIVES
+        self.invulnerable = False
+        self.invulnerable_timer = 0
+
+    def update(self, left=False, right=False):
+        self.prev_x = self.rect.x
+        if left and self.rect.left > ROAD_LEFT:
+            self.rect.x -= self.speed
+        if right and self.rect.right < ROAD_RIGHT:
+            self.rect.x += self.speed
+
+        # Update invulnerability timer
+        if self.invulnerable:
+            self.invulnerable_timer -= 1
+            if self.invulnerable_timer <= 0:
+                self.invulnerable = False
+
+    def nudge(self, direction):
+        """Move the car three steps at once, used by the touch buttons"""
+        if direction < 0 and self.rect.left > ROAD_LEFT:
+            self.rect.x -= self.speed * 3
+        elif direction > 0 and self.rect.right < ROAD_RIGHT:
+            self.rect.x += self.speed * 3
+
+    def make_invulnerable(self, duration=INVULNERABLE_FRAMES):
+        self.invulnerable = True
+        self.invulnerable_timer = duration
+
+    @property
+    def visible(self):
+        # The car blinks while invulnerable
+        return not (self.invulnerable and self.invulnerable_timer % 10 < 5)
+
+
+class Enemy:
+    """
+    A car coming down the road. With an index (collision_index.SpatialHash)
+    the car keeps itself filed in it as it moves (refiling only when it
+    reaches refile_y), and with clear_spawns it only respawns where it
+    doesn't overlap another car in the index.
+
+    With spawn=False the car is only allocated, off the road and outside
+    the index, until spawn() is called (see EnemyPool).
+    """
+    def __init__(self, rng=random, speed_range=(ENEMY_MIN_SPEED, ENEMY_MAX_SPEED),
+                 index=None, spawn_top=ENEMY_MIN_Y, clear_spawns=False, spawn=True):
+        self.rng = rng
+        self.speed_range = speed_range
+        self.index = index
+        self.spawn_top = spawn_top
+        self.clear_spawns = clear_spawns
+        self.image_name = ENEMY_IMAGES[0]
+        self.rect = pygame.Rect((0, SCREEN_HEIGHT), ENEMY_SIZE)
+        self.speed = 0
+        # Never refiled without an index
+        self.refile_y = float('inf')
+        self.prev_y = self.rect.y
+        if spawn:
+            self.spawn()
+
+    def spawn(self):
+        """Enter the road as a new car: new image, position and speed"""
+        # Randomly select one of the enemy car images
+        self.image_name = self.rng.choice(ENEMY_IMAGES)
+        if self.index is not None:
+            self.index.insert(self)
+        self.respawn()
+        self.prev_y = self.rect.y
+
+    def despawn(self):
+        """Leave the road (and the index) until the next spawn()"""
+        if self.index is not None:
+            self.index.remove(self)
+        self.refile_y = float('inf')
+
+    def place(self):
+        """Move to a random spot above the screen"""
+        rng = self.rng
+        for _ in range(SPAWN_ATTEMPTS if self.clear_spawns else 1):
+            self.rect.x = rng.randint(ENEMY_MIN_X, ENEMY_MAX_X)
+            self.rect.y = rng.randint(self.spawn_top, ENEMY_MAX_Y)
+            if not self.clear_spawns or self.index.is_clear(self.rect, self):
+                break
+        if self.index is not None:
+            self.refile_y = self.index.move(self)
+
+    def respawn(self):
+        self.place()
+        self.speed = self.rng.randint(*self.speed_range)
+
+    def update(self):
+        self.prev_y = self.rect.y
+        self.rect.y += self.speed
+        if self.rect.top > SCREEN_HEIGHT:
+            self.respawn()
+        elif self.rect.y >= self.refile_y:
+            self.refile_y = self.index.move(self)
+
+
+class EnemyPool:
+    """
+    Enemies allocated up front and recycled: acquire() spawns a free car
+    in place and release() takes it off the road again, so starting a race
+    or adding a car on level up allocates nothing. factory builds an
+    unspawned Enemy; the pool only grows past size if it runs dry.
+    """
+    def __init__(self, factory, size=0):
+        self.factory = factory
+        self.free = [factory() for _ in range(size)]
+        # Popped from the end, so keep the first allocated cars there
+        self.free.reverse()
+
+    def __len__(self):
+        return len(self.free)
+
+    def acquire(self):
+        enemy = self.free.pop() if self.free else self.factory()
+        enemy.spawn()
+        return enemy
+
+    def release(self, enemy):
+        enemy.despawn()
+        self.free.append(enemy)
+
+    def release_all(self, enemies):
+        """Release every enemy in the list and empty it"""
+        # In reverse, so they come back out in the same order
+        for enemy in reversed(enemies):
+            self.release(enemy)
+        enemies.clear()
+
+
+class Road:
+    def __init__(self):
+        self.y = 0
+        self.prev_y = 0
+        # Total scroll, which unlike y never wraps (see background.py)
+        self.distance = 0
+        self.prev_distance = 0
+        self.height = ROAD_HEIGHT
+        self.scroll_speed = ROAD_SCROLL_SPEED
+
+    def update(self):
+        self.prev_y = self.y
+        self.y += self.scroll_speed
+        self.prev_distance = self.distance
+        self.distance += self.scroll_speed
+        if self.y >= 0:
+            self.y = -self.height + SCREEN_HEIGHT
+
+
+class Scenery:
+    """
+    Every prop beside the road and in the sky, stored as one NumPy array
+    per field (kind, x, y, prev_y, speed, side and size) so moving and
+    respawning them are a few array operations however many there are.
+    kinds lists (image, size, where, speed, count) like SCENERY_KINDS;
+    density scales the number of roadside props.
+
+    Props whose speed is the road's (ground) stand still relative to it
+    and respawn fully above the screen, so a spot of road never changes
+    once it is in view (see background.py); the others float over it.
+
+    The props are purely visual: their random positions come from their
+    own generator, seeded once from rng, so the scenery never changes how
+    a race plays out.
+    """
+    def __init__(self, rng=random, kinds=SCENERY_KINDS, density=1.0):
+        self.kinds = kinds
+        self.density = density
+        if isinstance(rng, np.random.Generator):
+            self.rng = rng
+        else:
+            self.rng = np.random.default_rng(rng.getrandbits(64))
+
+        kind, side = [], []
+        for index, (_, _, where, _, count) in enumerate(kinds):
+            if where == ROADSIDE:
+                count = int(round(count * density))
+                kind += [index] * (2 * count)
+                side += [SIDE_LEFT] * count + [SIDE_RIGHT] * count
+            else:
+                kind += [index] * count
+                side += [SIDE_ANY] * count
+        self.kind = np.array(kind, dtype=np.intp)
+        self.side = np.array(side, dtype=np.int8)
+        sizes = np.array([size for _, size, _, _, _ in kinds], dtype=np.int64).reshape(-1, 2)
+        self.width = sizes[self.kind, 0]
+        self.height = sizes[self.kind, 1]
+        self.speed = np.array([speed for _, _, _, speed, _ in kinds], dtype=np.float64)[self.kind]
+        self.ground = self.speed == ROAD_SCROLL_SPEED
+
+        # Where each prop may respawn: on the grass of its side, or anywhere
+        self.min_x = np.where(self.side == SIDE_RIGHT, ROAD_RIGHT, 0)
+        self.max_x = np.where(self.side == SIDE_LEFT, ROAD_LEFT, SCREEN_WIDTH) - self.width
+        self.spawn_y = -self.height.astype(np.float64)
+
+        self.x = self.random_x(np.ones(len(self), dtype=bool))
+        self.y = self.rng.integers(0, SCREEN_HEIGHT, len(self), endpoint=True).astype(np.float64)
+        self.prev_y = self.y.copy()
+
+    def __len__(self):
+        return len(self.kind)
+
+    def random_x(self, mask):
+        return self.rng.integers(self.min_x[mask], self.max_x[mask], endpoint=True)
+
+    def update(self):
+        np.copyto(self.prev_y, self.y)
+        self.y += self.speed
+        # Most steps nothing leaves the screen; skip building the mask then
+        if len(self) and self.y.max() > SCREEN_HEIGHT:
+            gone = self.y > SCREEN_HEIGHT
+            self.x[gone] = self.random_x(gone)
+            self.y[gone] = self.spawn_y[gone]
+            self.prev_y[gone] = self.spawn_y[gone]
+
+    def ground_rows(self, top, bottom, distance):
+        """
+        Indices of the ground props overlapping rows [top, bottom) of the
+        road, where a prop at screen y is on row y - distance
+        """
+        v = self.y - distance
+        return np.flatnonzero(self.ground & (v < bottom) & (v + self.height > top))
+
+
+class RaceSimulation:
+    """
+    Complete game state: player, enemies, road scroll, scenery, score,
+    level and lives. Advance it one frame at a time with step().
+
+    rng is the random source for every spawn. It defaults to the global
+    random module; pass a seeded random.Random (or a seed) to make a race
+    reproducible. The remaining arguments tune the difficulty; enemies
+    spawn between spawn_top and ENEMY_MAX_Y, and with spawn_clearance not
+    on top of each other (see rush_hour_settings()).
+
+    With heavy traffic (max_enemy_count >= BROADPHASE_MIN_ENEMIES) or
+    spawn_clearance, the enemies are kept in a SpatialHash (self.index),
+    so collision checks only test the cars near the player however many
+    there are.
+
+    masks is an optional function returning the pygame.mask.Mask of an
+    image name (PLAYER_IMAGE or one of ENEMY_IMAGES). Without it cars
+    collide when their rects overlap; with it a rect hit only counts if
+    the opaque pixels overlap too, so the transparent corners of the
+    sprites don't cost lives.
+
+    scenery_density scales the number of trees and bushes.
+    """
+    def __init__(self, rng=random,
+                 start_enemy_count=START_ENEMY_COUNT,
+                 max_enemy_count=MAX_ENEMY_COUNT,
+                 enemy_speed=(ENEMY_MIN_SPEED, ENEMY_MAX_SPEED),
+                 points_per_level=POINTS_PER_LEVEL,
+                 spawn_top=ENEMY_MIN_Y,
+                 spawn_clearance=False,
+                 masks=None,
+                 scenery_density=1.0):
+        if not hasattr(rng, 'randint'):
+            rng = random.Random(rng)
+        self.rng = rng
+        self.start_enemy_count = start_enemy_count
+        self.max_enemy_count = max_enemy_count
+        self.enemy_speed = tuple(enemy_speed)
+        self.points_per_level = points_per_level
+        self.spawn_top = spawn_top
+        self.spawn_clearance = spawn_clearance
+        self.masks = masks
+        self.index = None
+        if max_enemy_count >= BROADPHASE_MIN_ENEMIES or spawn_clearance:
+            self.index = SpatialHash(ROAD_LEFT, ROAD_RIGHT)
+        self.pool = EnemyPool(
+            lambda: Enemy(self.rng, self.enemy_speed, self.index, self.spawn_top,
+                          self.spawn_clearance, spawn=False),
+            max(start_enemy_count, max_enemy_count))
+        self.player = Player()
+        self.enemies = []
+        self.road = Road()
+        self.scenery = Scenery(rng, density=scenery_density)
+        # Optional profiler.FrameProfiler timing each subsystem
+        self.profiler = None
+        self.reset()
+
+    def reset(self):
+        """
+        Start a new race, keeping the road and scenery where they are. The
+        player and the pooled enemies are reinitialized in place, so this
+        allocates nothing and loads nothing.
+        """
+        self.player.reset()
+        self.pool.release_all(self.enemies)
+        if self.index is not None:
+            self.index.clear()
+        self.enemy_count = self.start_enemy_count
+        for _ in range(self.enemy_count):
+            self.enemies.append(self.spawn_enemy())
+        self.game_over = False
+        self.score = 0
+        self.level = 1
+        self.frames = 0
+
+    def set_scenery_density(self, density):
+        """Replace the scenery with a denser or sparser one, without touching rng"""
+        if density != self.scenery.density:
+            self.scenery = Scenery(self.scenery.rng, self.scenery.kinds, density)
+
+    def spawn_enemy(self):
+        """A free enemy from the pool, spawned above the road"""
+        return self.pool.acquire()
+
+    def step(self, left=False, right=False):
+        """
+        Advance the game by one frame and return the list of events
+        (EVENT_LIFE_LOST, EVENT_CRASH, EVENT_LEVEL_UP) that happened in it
+        """
+        events = []
+        if self.game_over:
+            return events
+
+        self.frames += 1
+        profiler = self.profiler
+        self.player.update(left, right)
+        if profiler: profiler.lap('update.player')
+        self.road.update()
+        if profiler: profiler.lap('update.road')
+        self.scenery.update()
+        if profiler: profiler.lap('update.scenery')
+        for enemy in self.enemies:
+            enemy.update()
+        if profiler: profiler.lap('update.enemies')
+
+        # Check for collisions
+        player = self.player
+        if not player.invulnerable:
+            if self.index is not None:
+                hits = self.index.colliding(player.rect)
+            else:
+                hits = [enemy for enemy in self.enemies if player.rect.colliderect(enemy.rect)]
+            if hits and self.masks is not None:
+                # Second phase, only for the rects that touch
+                hits = [enemy for enemy in hits if self.pixels_overlap(enemy)]
+            for enemy in hits:
+                player.lives -= 1
+                if player.lives <= 0:
+                    self.game_over = True
+                    events.append(EVENT_CRASH)
+                else:
+                    player.make_invulnerable()
+                    events.append(EVENT_LIFE_LOST)
+
+                # Reset enemy position
+                enemy.place()
+        if profiler: profiler.lap('update.collisions')
+
+        # Update score
+        self.score += 1
+        if self.score % self.points_per_level == 0:
+            self.level += 1
+            events.append(EVENT_LEVEL_UP)
+            if self.level % 2 == 0 and self.enemy_count < self.max_enemy_count:  # Add a new enemy every 2 levels
+                self.enemy_count += 1
+                self.enemies.append(self.spawn_enemy())
+
+        return events
+
+    def pixels_overlap(self, enemy):
+        """Whether the opaque pixels of the player and enemy overlap"""
+        player = self.player.rect
+        offset = (enemy.rect.x - player.x, enemy.rect.y - player.y)
+        return self.masks(PLAYER_IMAGE).overlap(self.masks(enemy.image_name), offset) is not None
+
+    def run(self, policy=None, max_frames=None):
+        """
+        Play until game over (or max_frames) without any display. policy is
+        called with the simulation each frame and returns (left, right);
+        without one the car just drives straight.
+        """
+        while not self.game_over and (max_frames is None or self.frames < max_frames):
+            if policy is None:
+                self.step()
+            else:
+                self.step(*policy(self))
+        return self.score
+
+
+def rush_hour_settings(enemy_count=RUSH_HOUR_ENEMY_COUNT, density=RUSH_HOUR_DENSITY):
+    """RaceSimulation keyword arguments for a race with enemy_count cars throughout"""
+    area = enemy_count * ENEMY_SIZE[0] * ENEMY_SIZE[1] / density
+    band = max(ENEMY_MAX_Y - ENEMY_MIN_Y, int(area / (ENEMY_MAX_X + ENEMY_SIZE[0] - ENEMY_MIN_X)))
+    return {
+        'start_enemy_count': enemy_count,
+        'max_enemy_count': enemy_count,
+        'spawn_top': ENEMY_MAX_Y - band,
+        'spawn_clearance': True,
+    }
@@ -1,11 +1,6 @@
-import pygame
 import numpy as np
 import os
 import wave
-import struct
-
-# Initialize pygame mixer
-pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
 
 def create_crash_sound():
     """
@@ -53,48 +48,79 @@ def create_point_sound():
     
     return point
 
-def create_background_music():
+# Background music pattern: (start, end, frequency, amplitude), with start
+# and end in seconds inside one loop of MUSIC_LOOP_SECONDS. Each note's
+# sine wave starts at phase 0 when the note starts.
+MUSIC_LOOP_SECONDS = 10.0
+MUSIC_NOTES = (
+    # Base rhythm
+    [(i, i + 0.5, 220 if i % 2 == 0 else 330, 0.3) for i in range(10)]
+    # Higher notes
+    + [(i * 0.5, i * 0.5 + 0.25, 440 if i % 3 == 0 else (550 if i % 3 == 1 else 660), 0.2) for i in range(20)]
+    # Bass line
+    + [(i * 2, i * 2 + 1.5, 110 if i % 2 == 0 else 165, 0.4) for i in range(5)]
+)
+
+# Frames rendered per block when streaming long tracks
+CHUNK_FRAMES = 16384
+
+def render_music_block(start_frame, frames, sample_rate=44100):
+    """
+    Render frames mono samples of the (looping) background music starting
+    at start_frame, as unnormalized float64
+    """
+    block = np.zeros(frames)
+    loop_frames = int(MUSIC_LOOP_SECONDS * sample_rate)
+    end_frame = start_frame + frames
+    first_loop = start_frame // loop_frames
+    last_loop = (end_frame - 1) // loop_frames
+    for loop in range(first_loop, last_loop + 1):
+        loop_start = loop * loop_frames
+        for note_start, note_end, freq, amplitude in MUSIC_NOTES:
+            a = loop_start + int(note_start * sample_rate)
+            b = loop_start + int(note_end * sample_rate)
+            lo = max(a, start_frame)
+            hi = min(b, end_frame)
+            if lo >= hi:
+                continue
+            n = np.arange(lo - a, hi - a)
+            block[lo - start_frame:hi - start_frame] += amplitude * np.sin((2 * np.pi * freq / sample_rate) * n)
+    return block
+
+_music_peaks = {}
+
+def music_peak(sample_rate=44100):
+    """Largest absolute sample of one music loop, used to normalize it"""
+    if sample_rate not in _music_peaks:
+        loop_frames = int(MUSIC_LOOP_SECONDS * sample_rate)
+        peak = 0.0
+        for start in range(0, loop_frames, CHUNK_FRAMES):
+            block = render_music_block(start, min(CHUNK_FRAMES, loop_frames - start), sample_rate)
+            peak = max(peak, np.max(np.abs(block)))
+        _music_peaks[sample_rate] = peak
+    return _music_peaks[sample_rate]
+
+def to_stereo_pcm(mono, gain):
+    """Scale mono float samples and duplicate them into int16 stereo frames"""
+    pcm = (mono * (gain * 32767)).astype(np.int16)
+    return np.repeat(pcm[:, None], 2, axis=1)
+
+def iter_background_music(duration=MUSIC_LOOP_SECONDS, sample_rate=44100, chunk_frames=CHUNK_FRAMES):
+    """
+    Yield the background music as int16 stereo blocks of chunk_frames,
+    so tracks of any length are rendered in bounded memory
+    """
+    gain = 1.0 / music_peak(sample_rate)
+    total = int(sample_rate * duration)
+    for start in range(0, total, chunk_frames):
+        frames = min(chunk_frames, total - start)
+        yield to_stereo_pcm(render_music_block(start, frames, sample_rate), gain)
+
+def create_background_music(duration=MUSIC_LOOP_SECONDS):
     """
     Creates simple background music
     """
-    sample_rate = 44100
-    duration = 10.0  # seconds (will loop)
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    
-    # Create a simple melody
-    music = np.zeros((int(sample_rate * duration), 2))
-    
-    # Base rhythm
-    for i in range(10):
-        start = int(i * sample_rate)
-        end = int((i + 0.5) * sample_rate)
-        freq = 220 if i % 2 == 0 else 330
-        music[start:end, 0] += 0.3 * np.sin(2 * np.pi * freq * t[0:end-start])
-        music[start:end, 1] += 0.3 * np.sin(2 * np.pi * freq * t[0:end-start])
-    
-    # Add some higher notes
-    for i in range(20):
-        start = int(i * 0.5 * sample_rate)
-        end = int((i * 0.5 + 0.25) * sample_rate)
-        freq = 440 if i % 3 == 0 else (550 if i % 3 == 1 else 660)
-        music[start:end, 0] += 0.2 * np.sin(2 * np.pi * freq * t[0:end-start])
-        music[start:end, 1] += 0.2 * np.sin(2 * np.pi * freq * t[0:end-start])
-    
-    # Add a bass line
-    for i in range(5):
-        start = int(i * 2 * sample_rate)
-        end = int((i * 2 + 1.5) * sample_rate)
-        freq = 110 if i % 2 == 0 else 165
-        music[start:end, 0] += 0.4 * np.sin(2 * np.pi * freq * t[0:end-start])
-        music[start:end, 1] += 0.4 * np.sin(2 * np.pi * freq * t[0:end-start])
-    
-    # Normalize
-    music = music / np.max(np.abs(music))
-    
-    # Convert to 16-bit PCM
-    music = (music * 32767).astype(np.int16)
-    
-    return music
+    return np.concatenate(list(iter_background_music(duration)))
 
 def create_life_lost_sound():
     """
@@ -117,24 +143,39 @@ def create_life_lost_sound():
     
     return life_lost
 
+class WavWriter:
+    """
+    Streaming 16-bit PCM WAV writer. Blocks of int16 frames are written
+    as single buffers straight from NumPy; the header is fixed up with the
+    final length when the file is closed.
+    """
+    def __init__(self, filename, sample_rate=44100, channels=2):
+        self.channels = channels
+        self.wav_file = wave.open(filename, 'wb')
+        self.wav_file.setnchannels(channels)
+        self.wav_file.setsampwidth(2)  # 2 bytes for 16-bit audio
+        self.wav_file.setframerate(sample_rate)
+
+    def write(self, block):
+        """Write an array of shape (frames, channels)"""
+        self.wav_file.writeframesraw(np.ascontiguousarray(block, dtype='<i2').tobytes())
+
+    def close(self):
+        self.wav_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 def save_wav(sound_array, filename, sample_rate=44100):
     """
     Save a numpy array as a WAV file
     """
-    with wave.open(filename, 'w') as wav_file:
-        # Set parameters
-        nchannels = 2
-        sampwidth = 2  # 2 bytes for 16-bit audio
-        framerate = sample_rate
-        nframes = len(sound_array)
-        comptype = 'NONE'
-        compname = 'not compressed'
-        
-        wav_file.setparams((nchannels, sampwidth, framerate, nframes, comptype, compname))
-        
-        # Write frames
-        for sample in sound_array:
-            wav_file.writeframes(struct.pack('<hh', sample[0], sample[1]))
+    with WavWriter(filename, sample_rate) as writer:
+        for start in range(0, len(sound_array), CHUNK_FRAMES):
+            writer.write(sound_array[start:start + CHUNK_FRAMES])
 
 # Create and save sounds
 def generate_sounds():
@@ -148,9 +189,10 @@ def generate_sounds():
     point_sound = create_point_sound()
     save_wav(point_sound, os.path.join('assets', 'sounds', 'point.wav'))
     
-    # Create and save background music
-    background_music = create_background_music()
-    save_wav(background_music, os.path.join('assets', 'sounds', 'background_music.wav'))
+    # Stream the background music to disk block by block
+    with WavWriter(os.path.join('assets', 'sounds', 'background_music.wav')) as writer:
+        for block in iter_background_music():
+            writer.write(block)
     
     # Create and save life lost sound
     life_lost_sound = create_life_lost_sound()
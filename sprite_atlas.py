@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import pygame
+
+# Packs the small sprites of assets/images into one atlas image plus a
+# JSON manifest of where each sprite ended up, so the web build fetches
+# and decodes a single file instead of one per sprite. The asset cache
+# reads the manifest and hands out subsurfaces of the atlas by file name.
+#
+#   python sprite_atlas.py assets/images build/web/assets/images
+
+ATLAS_IMAGE = 'atlas.png'
+ATLAS_MANIFEST = 'atlas.json'
+
+# Larger images (the 800x800 road) would mostly add empty space
+MAX_SPRITE_SIZE = 256
+# Transparent gutter between sprites
+PADDING = 1
+
+
+def shelf_pack(sizes, width, padding=PADDING):
+    """
+    Place (w, h) sizes on shelves of the given width, tallest first.
+    Returns ({index: (x, y)}, height).
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = {}
+    x = y = shelf_height = 0
+    for i in order:
+        w, h = sizes[i]
+        if x and x + w > width:
+            # Start a new shelf below the current one
+            y += shelf_height + padding
+            x = shelf_height = 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+    return positions, y + shelf_height
+
+def pack_rects(sizes, padding=PADDING):
+    """
+    Pack the sizes into the smallest-area rectangle found by trying every
+    shelf width from the widest sprite up to a single row.
+    Returns ([(x, y), ...] in input order, (width, height)).
+    """
+    if not sizes:
+        return [], (0, 0)
+    widest = max(w for w, _ in sizes)
+    row = sum(w for w, _ in sizes) + padding * (len(sizes) - 1)
+    best = None
+    for width in range(widest, row + 1):
+        positions, height = shelf_pack(sizes, width, padding)
+        used = max(positions[i][0] + sizes[i][0] for i in positions)
+        # Prefer the smaller area, then the squarer atlas
+        score = (used * height, abs(used - height))
+        if best is None or score < best[0]:
+            best = (score, positions, (used, height))
+    _, positions, size = best
+    return [positions[i] for i in range(len(sizes))], size
+
+def atlas_candidates(image_dir, max_size=MAX_SPRITE_SIZE):
+    """PNG files in image_dir small enough to go into the atlas"""
+    names = []
+    for name in sorted(os.listdir(image_dir)):
+        if not name.lower().endswith('.png') or name == ATLAS_IMAGE:
+            continue
+        width, height = pygame.image.load(os.path.join(image_dir, name)).get_size()
+        if width <= max_size and height <= max_size:
+            names.append(name)
+    return names
+
+def build_atlas(image_dir, output_dir, names=None, padding=PADDING):
+    """
+    Pack the sprites (by default every atlas candidate of image_dir) into
+    output_dir/atlas.png and write output_dir/atlas.json. Returns the
+    names that were packed.
+    """
+    if names is None:
+        names = atlas_candidates(image_dir)
+    images = [pygame.image.load(os.path.join(image_dir, name)) for name in names]
+    positions, size = pack_rects([image.get_size() for image in images], padding)
+
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    sheet.fill((0, 0, 0, 0))
+    sprites = {}
+    for name, image, (x, y) in zip(names, images, positions):
+        # MAX onto the cleared sheet copies the pixels exactly, alpha included
+        sheet.blit(image, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+        sprites[name] = [x, y, image.get_width(), image.get_height()]
+
+    os.makedirs(output_dir, exist_ok=True)
+    pygame.image.save(sheet, os.path.join(output_dir, ATLAS_IMAGE))
+    manifest = {'image': ATLAS_IMAGE, 'size': list(size), 'sprites': sprites}
+    with open(os.path.join(output_dir, ATLAS_MANIFEST), 'w') as f:
+        json.dump(manifest, f, sort_keys=True, separators=(',', ':'))
+    return names
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the game sprites into one atlas image")
+    parser.add_argument('image_dir', help="directory with the sprite PNGs")
+    parser.add_argument('output_dir', help="where to write atlas.png and atlas.json")
+    args = parser.parse_args(argv)
+
+    names = build_atlas(args.image_dir, args.output_dir)
+    print(f"Packed {len(names)} sprites into {os.path.join(args.output_dir, ATLAS_IMAGE)}")
+
+if __name__ == "__main__":
+    main()
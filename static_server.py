@@ -0,0 +1,283 @@
+import argparse
+import email.utils
+import gzip
+import hashlib
+import os
+import threading
+import webbrowser
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from asset_hashing import IMMUTABLE_CACHE, SHORT_CACHE, is_hashed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Local stand-in for the CDN that hosts build/web. Compared with
+# `python -m http.server` it
+#   - serves .br/.gz variants written next to each file at build time
+#     (precompress) to clients that accept them,
+#   - sends strong ETags and answers If-None-Match with 304,
+#   - honours single byte ranges (and If-Range) for the big bundles,
+#   - handles each connection on its own thread, and
+#   - logs every request with its status, size, encoding and latency.
+#
+#   python static_server.py                      serve build/web on port 8000
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIRECTORY = os.path.join(BASE_DIR, 'build', 'web')
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.css', '.json', '.txt', '.svg', '.wasm',
+                           '.data', '.apk', '.tar', '.py', '.wav', '.toml')
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+PRECOMPRESSED_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+# Smaller files aren't worth a variant
+MIN_COMPRESS_SIZE = 256
+COPY_CHUNK = 64 * 1024
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output identical between builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def precompress(directory):
+    """
+    Write .br (if the brotli module is installed) and .gz variants next to
+    every compressible file in directory. Variants newer than their file
+    are kept; ones that wouldn't save anything are removed. Returns the
+    number of variants written.
+    """
+    encodings = [(encoding, suffix) for encoding, suffix in ENCODINGS
+                 if encoding != 'br' or brotli is not None]
+    written = 0
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if not file.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, file)
+            stat = os.stat(path)
+            for encoding, suffix in encodings:
+                variant = path + suffix
+                if os.path.exists(variant) and os.stat(variant).st_mtime_ns >= stat.st_mtime_ns:
+                    continue
+                if stat.st_size < MIN_COMPRESS_SIZE:
+                    if os.path.exists(variant):
+                        os.remove(variant)
+                    continue
+                with open(path, 'rb') as f:
+                    data = compress(f.read(), encoding)
+                if len(data) < stat.st_size * 0.9:
+                    with open(variant, 'wb') as f:
+                        f.write(data)
+                    written += 1
+                elif os.path.exists(variant):
+                    os.remove(variant)
+    return written
+
+
+class StaticRequestHandler(SimpleHTTPRequestHandler):
+    # Keep connections open between requests, as the CDN does
+    protocol_version = 'HTTP/1.1'
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **{
+        '.wasm': 'application/wasm',
+        '.apk': 'application/octet-stream',
+        '.json': 'application/json',
+    })
+    # (path, size, mtime) -> ETag, shared by every handler thread
+    etags = {}
+    etags_lock = threading.Lock()
+
+    def cache_control(self, path):
+        """Cache-Control for a file, as in the generated vercel.json"""
+        if is_hashed(path):
+            return IMMUTABLE_CACHE
+        return SHORT_CACHE
+
+    def etag(self, path, stat):
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self.etags_lock:
+            tag = self.etags.get(key)
+        if tag is None:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(COPY_CHUNK), b''):
+                    digest.update(block)
+            tag = f'"{digest.hexdigest()[:32]}"'
+            with self.etags_lock:
+                self.etags[key] = tag
+        return tag
+
+    def choose_encoding(self, path):
+        """The best precompressed variant the client accepts: (encoding, path)"""
+        accepted = {part.split(';')[0].strip().lower()
+                    for part in self.headers.get('Accept-Encoding', '').split(',')}
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                return encoding, path + suffix
+        return None, path
+
+    def parse_range(self, size):
+        """
+        (start, end) of a single satisfiable bytes range, None to send the
+        whole file, or 'invalid' for an unsatisfiable one.
+        """
+        header = self.headers.get('Range')
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None  # Multiple ranges aren't supported: send everything
+        first, _, last = header[len('bytes='):].strip().partition('-')
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+            else:
+                start = max(size - int(last), 0)
+                end = size - 1
+        except ValueError:
+            return None
+        if start >= size or start > end:
+            return 'invalid'
+        return start, min(end, size - 1)
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def serve(self, send_body):
+        start_time = perf_counter()
+        self.status = None
+        sent = 0
+        encoding = None
+        try:
+            path = self.translate_path(self.path)
+            if os.path.isdir(path):
+                if not self.path.split('?')[0].endswith('/'):
+                    # Relative links in the index need the trailing slash
+                    self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                    self.send_header('Location', self.path.split('?')[0] + '/')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                path = os.path.join(path, 'index.html')
+            if not os.path.isfile(path) or path.endswith(PRECOMPRESSED_SUFFIXES):
+                self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+                return
+
+            encoding, file_path = self.choose_encoding(path)
+            stat = os.stat(file_path)
+            etag = self.etag(file_path, stat)
+            size = stat.st_size
+
+            if_none_match = [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]
+            if etag in if_none_match or '*' in if_none_match:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_common_headers(path, etag, stat, encoding)
+                self.end_headers()
+                return
+
+            byte_range = self.parse_range(size)
+            if_range = self.headers.get('If-Range')
+            if byte_range is not None and if_range is not None and if_range.strip() != etag:
+                byte_range = None  # The client's partial copy is out of date
+            if byte_range == 'invalid':
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if byte_range is None:
+                first, last = 0, size - 1
+                self.send_response(HTTPStatus.OK)
+            else:
+                first, last = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header('Content-Range', f'bytes {first}-{last}/{size}')
+            self.send_common_headers(path, etag, stat, encoding)
+            self.send_header('Content-Length', str(last - first + 1))
+            self.end_headers()
+
+            if send_body:
+                with open(file_path, 'rb') as f:
+                    f.seek(first)
+                    remaining = last - first + 1
+                    while remaining > 0:
+                        block = f.read(min(COPY_CHUNK, remaining))
+                        if not block:
+                            # The file shrank: the promised length can't be met
+                            self.close_connection = True
+                            break
+                        self.wfile.write(block)
+                        remaining -= len(block)
+                        sent += len(block)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client went away
+        finally:
+            elapsed = (perf_counter() - start_time) * 1000
+            self.log_message('"%s" %s %d %s %.1f ms', self.requestline, self.status,
+                             sent, encoding or 'identity', elapsed)
+
+    def send_common_headers(self, path, etag, stat, encoding):
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_header('Cache-Control', self.cache_control(path))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+
+    def send_response(self, code, message=None):
+        self.status = int(code)
+        super().send_response(code, message)
+
+    def log_request(self, code='-', size='-'):
+        pass  # serve() logs once the body is out, with the latency
+
+
+def create_server(directory=DEFAULT_DIRECTORY, port=8000, host=''):
+    """A threaded server for directory (not started)"""
+    handler = lambda *args, **kwargs: StaticRequestHandler(*args, directory=directory, **kwargs)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def serve(directory=DEFAULT_DIRECTORY, port=8000, open_browser=False, compress=True):
+    """Precompress directory and serve it until interrupted"""
+    if compress:
+        written = precompress(directory)
+        if written:
+            print(f"Precompressed {written} file variant(s)")
+        if brotli is None:
+            print("brotli module not installed: serving gzip variants only")
+    with create_server(directory, port) as server:
+        print(f"Serving {directory} at http://localhost:{port}")
+        print("Press Ctrl+C to stop the server")
+        if open_browser:
+            webbrowser.open(f"http://localhost:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nServer stopped")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the web build like the CDN does")
+    parser.add_argument('--directory', default=DEFAULT_DIRECTORY, help="directory to serve (default build/web)")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--no-compress', action='store_true', help="don't write .br/.gz variants first")
+    parser.add_argument('--open', action='store_true', help="open the game in the browser")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: {args.directory} not found. Please build the game first.")
+        return
+    serve(args.directory, args.port, args.open, not args.no_compress)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+import web_wrapper
+
+
+def test_web_game_constructs():
+    pygame.init()
+    pygame.display.set_mode((800, 600))
+    game = web_wrapper.WebGame(load=False)
+    try:
+        progress = []
+        game.draw_loading_screen = progress.append
+        asyncio.run(game.load_assets_async())
+        # One step per asset, ending with everything loaded
+        assert progress[0] == 0
+        assert progress == sorted(progress)
+        assert progress[-1] == 1
+        assert len(progress) > 2
+        assert game.player_image is not None
+    finally:
+        game.stop_music()
+        pygame.quit()
+
+
+def test_web_game_keeps_streaming_music():
+    pygame.init()
+    pygame.display.set_mode((800, 600))
+    game = web_wrapper.WebGame(load=False)
+    try:
+        asyncio.run(game.load_assets_async())
+        game.start_music()
+        if game.music is None:
+            return  # No mixer to stream to
+        # Longer than the blocks start() queues: only frame() keeps it going
+        start = time.perf_counter()
+        while time.perf_counter() - start < 1.0:
+            game.frame()
+        assert game.music.channel.get_busy()
+    finally:
+        game.stop_music()
+        pygame.quit()
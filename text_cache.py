@@ -0,0 +1,47 @@
+# Font rasterization is one of the most expensive things done per frame,
+# yet most HUD strings are identical from one frame to the next. TextCache
+# keeps rendered strings around and builds fast-changing numbers such as
+# the score out of pre-rendered digit glyphs.
+
+
+class TextCache:
+    def __init__(self, font, max_entries=128):
+        self.font = font
+        self.max_entries = max_entries
+        self.strings = {}
+        self.glyphs = {}
+
+    def render(self, text, color):
+        """Return the rendered text, rasterizing it only the first time"""
+        key = (text, tuple(color))
+        image = self.strings.get(key)
+        if image is None:
+            if len(self.strings) >= self.max_entries:
+                # Drop the oldest entry
+                del self.strings[next(iter(self.strings))]
+            image = self.font.render(text, True, color)
+            self.strings[key] = image
+        return image
+
+    def glyph(self, char, color):
+        key = (char, tuple(color))
+        image = self.glyphs.get(key)
+        if image is None:
+            image = self.font.render(char, True, color)
+            self.glyphs[key] = image
+        return image
+
+    def draw_number(self, surface, label, value, color, pos):
+        """
+        Draw label followed by value. The label comes from the string cache
+        and each digit is a cached glyph, so a changing number never has
+        to go through the font renderer.
+        """
+        x, y = pos
+        label_image = self.render(label, color)
+        surface.blit(label_image, (x, y))
+        x += label_image.get_width()
+        for char in str(value):
+            glyph = self.glyph(char, color)
+            surface.blit(glyph, (x, y))
+            x += glyph.get_width()
@@ -0,0 +1,55 @@
+import pygame
+from simulation import STEPS_PER_SECOND
+
+# Entities that move further than this in one step (respawns, the road
+# wrapping round) are drawn at their new position instead of sliding there
+SNAP_DISTANCE = 100
+
+
+def interpolate(prev, current, alpha):
+    """Blend a coordinate between the last two simulation steps"""
+    if abs(current - prev) > SNAP_DISTANCE:
+        return current
+    return prev + (current - prev) * alpha
+
+
+class FixedTimestep:
+    """
+    Runs the simulation at a fixed rate no matter how fast frames are drawn.
+
+    Each call to tick() waits for the next render frame (capped at max_fps,
+    or uncapped when max_fps is 0/None), adds the real time that passed to
+    an accumulator and returns how many simulation steps are due. alpha is
+    how far the render time has got into the next step, for interpolation.
+    """
+    def __init__(self, step_rate=STEPS_PER_SECOND, max_fps=60, max_steps_per_frame=5):
+        self.step_time = 1.0 / step_rate
+        self.max_fps = max_fps
+        self.max_steps_per_frame = max_steps_per_frame
+        self.clock = pygame.time.Clock()
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.clock.tick()
+
+    def tick(self):
+        """Wait for the next render frame and return the number of steps to run"""
+        self.accumulator += self.clock.tick(self.max_fps or 0) / 1000.0
+        steps = int(self.accumulator / self.step_time)
+        if steps > self.max_steps_per_frame:
+            # Too far behind to catch up: drop the backlog rather than
+            # spending every frame simulating
+            steps = self.max_steps_per_frame
+            self.accumulator %= self.step_time
+        else:
+            self.accumulator -= steps * self.step_time
+        self.alpha = self.accumulator / self.step_time
+        return steps
+
+    def reset(self):
+        """Forget time spent outside the game loop (loading screens, pauses)"""
+        self.clock.tick()
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+    def get_fps(self):
+        return self.clock.get_fps()
@@ -5,6 +5,7 @@ import json
 import shutil
 import webbrowser
 import time
+import asset_hashing
 
 def check_requirements():
     """Check if required tools are installed"""
@@ -69,16 +70,9 @@ def create_vercel_config():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     build_dir = os.path.join(current_dir, "build", "web")
     
-    # Create vercel.json
-    vercel_config = {
-        "version": 2,
-        "builds": [
-            {"src": "**/*", "use": "@vercel/static"}
-        ],
-        "routes": [
-            {"src": "/(.*)", "dest": "/"}
-        ]
-    }
+    # Create vercel.json: content-hashed files are immutable, the rest
+    # is revalidated after a minute
+    vercel_config = asset_hashing.vercel_config(build_dir)
     
     # Write the configuration file
     with open(os.path.join(build_dir, "vercel.json"), "w") as f: